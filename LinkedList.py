@@ -143,6 +143,8 @@ class LinkedList:
             raise ValueError("LinkedList.remove(x): x not in LinkedList")
 
     class Node:
+        __slots__ = ("payload", "prev", "next")
+
         def __init__(self, payload):
             self.payload = payload
             self.prev = None
@@ -1,32 +1,32 @@
-from LinkedList import LinkedList
-
 class Stack:
 
+    # The solvers push and pop millions of times per problem instance, so the items live in a plain Python list,
+    # whose append and pop from the end are both O(1) and allocate no per-item nodes
+    __slots__ = ("__items",)
+
     class TopElementError(Exception):
         def __init__(self):
             super().__init__("Stack is empty")
 
     def __init__(self):
-        self.__items = LinkedList()
+        self.__items = []
 
     def __repr__(self):
         return repr(self.__items)
     
     def is_empty(self):
-        return self.__items.size() == 0
+        return not self.__items
     
     def push(self, element):
-        self.__items.add(element)
+        self.__items.append(element)
     
     def pop(self):
-        if self.is_empty():
+        if not self.__items:
             raise self.TopElementError()
-        element = self.__items[-1]
-        del self.__items[-1]
-        return element
+        return self.__items.pop()
     
     def peek(self):
-        if self.is_empty():
+        if not self.__items:
             raise self.TopElementError()
         return self.__items[-1]
     
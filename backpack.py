@@ -1,115 +1,391 @@
-import numpy as np
+# NumPy, process pools and the reduction module are imported by the functions that use them, so that importing this
+# module (and solving small instances with the pure-Python methods) stays fast
 from Stack import Stack
 from itertools import combinations
+from bisect import bisect_right
+from array import array
+from contextlib import contextmanager
+import sys
 import time
 
+# Number of items whose subsets are checked together in a single vectorized step of the brute force method
+BRUTE_FORCE_CHUNK_BITS = 16
+
+# Number of combined subsets that the Schroeppel-Shamir method sorts and matches together in a single vectorized step
+SCHROEPPEL_SHAMIR_CHUNK_SIZE = 2**16
+
+# Default approximation ratio of the fptas method, whose solutions are worth at least (1 - epsilon) times the optimal value
+FPTAS_EPSILON = 0.1
+
+# Solving methods whose solutions aren't always optimal, even when they run to completion
+APPROXIMATE_METHODS = ("fptas",)
+
+# Number of knapsack situations that the search methods expand between checks of their time budget
+BUDGET_CHECK_INTERVAL = 1024
+
+# Thresholds for the "auto" method, calibrated against the files in problems/. There, branch and bound is the fastest
+# method on every instance, since item values and weights are uncorrelated; its Dantzig bound is much weaker when they
+# are strongly correlated, while the running time of dynamic programming only depends on items times capacity.
+AUTO_SEARCH_ITEMS = 16 # Up to this many items, even branch and bound's worst case takes a fraction of a second, and it needs no NumPy
+AUTO_SMALL_DP_CELLS = 10**6 # Dynamic programming tables this small take about a millisecond, so there's no need to gamble
+AUTO_CORRELATION_LIMIT = 0.8 # Above this rank correlation between values and weights (under 0.5 in problems/), branch and bound is avoided if possible
+AUTO_SMALL_VALUE_DP_CELLS = 10**6 # Likewise for tables indexed by total value, for instances whose capacity is too big
+AUTO_MEET_IN_MIDDLE_ITEMS = 40 # Meet in the middle is only considered up to this many items
+AUTO_DP_CELLS_PER_SUBSET = 40 # Meet in the middle takes about as long for each subset of a half as dynamic programming takes for this many table cells
+AUTO_SCHROEPPEL_SHAMIR_ITEMS = 60 # The Schroeppel-Shamir method is only considered up to this many items
+AUTO_MEMORY_BUDGET = 2**28 # Default number of bytes that the method chosen by "auto" may use
+
+
+class ProblemInstance:
+    '''A single Knapsack Problem instance, with its items stored as a list of names and parallel int64 arrays of values and weights.'''
+
+    __slots__ = ("name", "capacity", "names", "values", "weights")
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity
+        self.names = []
+        self.values = array('q')
+        self.weights = array('q')
+
+    def __repr__(self):
+        return f"ProblemInstance({self.name!r}, capacity={self.capacity}, {len(self.names)} items)"
+
+    def addItem(self, name, value, weight):
+        self.names.append(name)
+        self.values.append(value)
+        self.weights.append(weight)
+
+    def items(self):
+        '''Return the list of (name, value, weight) item tuples that the Solver methods work with.'''
+        return list(zip(self.names, self.values.tolist(), self.weights.tolist()))
+
+
+class SolverStats:
+    '''Statistics that a solving method records about one problem instance.
+
+    nodes_expanded and nodes_pruned count the knapsack situations (or, for bruteForce, the combinations of the items
+    outside the vectorized chunk) that were searched and cut off. subset_counts and phase_times map names to the
+    number of subsets in each list that a method builds, and to the seconds spent in each phase of a method.
+    If a search runs out of its time or node budget, optimal is False and upper_bound is a proven upper bound
+    on the value of any solution, to compare against best_value, the value of the solution that was returned.'''
+
+    __slots__ = ("method", "elapsed", "cached", "nodes_expanded", "nodes_pruned", "max_stack_depth",
+                 "subset_counts", "phase_times", "optimal", "best_value", "upper_bound")
+
+    def __init__(self, method=None):
+        self.method = method
+        self.elapsed = 0.0
+        self.cached = False
+        self.nodes_expanded = 0
+        self.nodes_pruned = 0
+        self.max_stack_depth = 0
+        self.subset_counts = dict()
+        self.phase_times = dict()
+        self.optimal = True
+        self.best_value = None
+        self.upper_bound = None
+
+    @property
+    def gap(self):
+        '''The fraction of the upper bound by which the returned solution might fall short of the optimum.'''
+        if not self.upper_bound:
+            return 0.0
+        return (self.upper_bound - self.best_value) / self.upper_bound
+
+    def __repr__(self):
+        return f"SolverStats({', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)})"
+
+    def asDict(self):
+        stats = {name: getattr(self, name) for name in self.__slots__}
+        stats["gap"] = self.gap
+        return stats
+
+    @contextmanager
+    def timePhase(self, name):
+        '''Add the time spent in the body of a with statement to the named phase.'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + time.perf_counter() - start
+
 
 class Solver:
     '''A class for storing and solving Knapsack Problem instances.'''
     
-    def __init__(self):
+    def __init__(self, search_workers=1, memory_budget=AUTO_MEMORY_BUDGET):
+
+        # Number of worker processes that the bruteForce and meetInMiddle methods split a single instance's search across
+        self.search_workers = search_workers
+
+        # Number of bytes that the method chosen by the "auto" method may use for a single instance
+        self.memory_budget = memory_budget
+
+        # The SolverStats of each loaded problem instance, and the functions to call with them as each instance is solved
+        self.stats = []
+        self.stats_hooks = []
+
+        # Seconds and knapsack situations that the search methods may spend on each instance before returning their best solution so far
+        self.time_limit = None
+        self.node_limit = None
+
+        # Approximation ratio of the fptas method
+        self.epsilon = FPTAS_EPSILON
+
+        # Solutions (lists of item names) that the branchAndBound method starts from, by problem index; set by each getSolutions call
+        self.warm_starts = dict()
 
         # Constant dict that maps solving method parameter name to the corresponding function name
         self.SOLVER_METHODS = {
             "bruteForce": self.__solveBruteForce,
             "backtrack": self.__solveBacktrack,
             "branchAndBound": self.__solveBranchAndBound,
-            "meetInMiddle": self.__solveMiddle
+            "meetInMiddle": self.__solveMiddle,
+            "schroeppelShamir": self.__solveSchroeppelShamir,
+            "dynamicProgramming": self.__solveDynamicProgramming,
+            "minWeightDynamicProgramming": self.__solveMinWeightDynamicProgramming,
+            "fptas": self.__solveFptas,
+            "auto": self.__solveAuto
         }
 
     def loadProblemFromFile(self, filename):
         '''Load the problems represented in the specified text file into this Solver.'''
+        self.loadProblemInstances(iterProblemsFromFile(filename))
 
-        # List of (max_weight, [items]) tuples. Each item is a tuple of (name, value, weight)
-        self.problems = []
+    def loadProblemInstances(self, instances):
+        '''Load the given ProblemInstances into this Solver, e.g. from iterProblemsFromFile or a binary_problems.BinaryProblemFile.'''
 
-        try:
-            f = open(filename)
-        except FileNotFoundError:
-            f = open('problems/' + filename)
+        # List of (max_weight, [items]) tuples. Each item is a tuple of (name, value, weight)
+        self.problems = [(instance.capacity, instance.items()) for instance in instances]
 
-        # Skip the first line
-        next(f)
+        # Warm starts are by problem index, so they don't carry over to new problems
+        self.warm_starts = dict()
 
-        # Read each subsequent line
-        for line in f:
-            line_values = line.split()
+    def incrementalProblem(self, problem_index):
+        '''Return an IncrementalProblem holding a copy of the specified problem instance, to edit and solve again and again.'''
+        return IncrementalProblem(*self.problems[problem_index])
 
-            # Check if the line is a problem name
-            if len(line_values) == 1:
-                # Append a new (max_weight, [items]) tuple to the list of problems, with the list of items currently empty
-                self.problems.append((int(next(f).strip()), []))
-                continue
+    def addStatsHook(self, hook):
+        '''Call hook(problem_index, stats) with the SolverStats of each problem instance as soon as getSolutions solves it.'''
+        self.stats_hooks.append(hook)
 
-            # Okay, it's a normal line with an item on it. Add it to the current list of items
-            line_values[1] = int(line_values[1])
-            line_values[2] = int(line_values[2])
-            line_values = tuple(line_values)
-            self.problems[-1][1].append(line_values)
-        
-        f.close()
+    def getSolutions(self, method, verbosity=0, workers=None, cache=None, reduce=False, return_stats=False,
+                     time_limit=None, node_limit=None, epsilon=FPTAS_EPSILON, warm_starts=None):
+        '''Solve all of the problem instances loaded into this Solver, using the specified internal algorithm.
 
-    def getSolutions(self, method, verbosity=0):
-        '''Solve all of the problem instances loaded into this Solver, using the specified internal algorithm.'''
+        If workers is more than 1, the instances are solved in parallel by that many worker processes. Each of them still
+        splits its bruteForce and meetInMiddle searches across self.search_workers processes of its own, so up to
+        workers * search_workers processes may run at once.
+        If a solution_cache.SolutionCache is given, instances already in it aren't solved again, and new solutions are added to it.
+        If reduce is True, each instance is first shrunk by reduction.reduceProblem, and only the remaining core problem is searched.
+        The ReductionResult of each instance is then kept in self.reductions.
+        If method is "auto", the method chosen for each instance by selectMethod is kept in self.selected_methods.
+        The SolverStats of each instance are kept in self.stats, and also returned alongside the solutions if return_stats is True.
+        The bruteForce, backtrack and branchAndBound methods stop searching an instance after time_limit seconds or node_limit
+        knapsack situations, and return the best solution found so far; its stats then hold the optimality gap.
+        The fptas method returns solutions worth at least (1 - epsilon) times the optimal value, and its stats hold a
+        certified upper bound on the optimal value.
+        warm_starts optionally maps problem indices to solutions (lists of item names) that the branchAndBound method starts
+        its search from, for this call only; a warm start is ignored unless it names only items of the instance being
+        searched (after any reduction) and fits in its capacity.'''
 
         # Confirm that method argument is valid
         if method not in self.SOLVER_METHODS:
             raise ValueError(f"Invalid method. Valid method names: {', '.join(self.SOLVER_METHODS.keys())}")
 
-        # Delegate to the function that uses the specified solving method; return a list of solutions for the whole file
-        solutions = []
-        for i in range(len(self.problems)):
-            start = time.perf_counter()
-            problem_instance_solution = self.SOLVER_METHODS[method](i)
-            end = time.perf_counter()
-            solutions.append(sorted(problem_instance_solution))
-            if verbosity == 1:
-                print(f"Solved {i + 1}/{len(self.problems)} ({'%.3f' % (end - start)} sec)")
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.epsilon = epsilon
+        self.warm_starts = dict() if warm_starts is None else dict(warm_starts)
+
+        # Fill in the solutions that are already cached; the rest are left to solve
+        solutions = [None] * len(self.problems)
+        self.stats = [SolverStats(method) for i in range(len(self.problems))]
+        unsolved = []
+        for i, (capacity, items) in enumerate(self.problems):
+            if cache is not None:
+                solutions[i] = cache.lookup(capacity, items)
+            if solutions[i] is None:
+                unsolved.append(i)
+            else:
+                self.stats[i].cached = True
+                self.__reportStats(i)
+                if verbosity == 1:
+                    print(f"Solved {i + 1}/{len(self.problems)} (cached)")
+
+        # Swap each instance for its core problem while solving, so that the solving methods only search the core
+        original_problems = self.problems
+        self.reductions = [None] * len(self.problems)
+        if reduce:
+            from reduction import reduceProblem
+            self.problems = list(original_problems)
+            for i in unsolved:
+                self.reductions[i] = reduceProblem(*original_problems[i])
+                self.problems[i] = (self.reductions[i].capacity, self.reductions[i].items)
+                if verbosity == 1:
+                    print(f"Reduced {i + 1}/{len(self.problems)}: {len(original_problems[i][1])} -> {len(self.problems[i][1])} items "
+                          f"({', '.join(f'{count} {step}' for step, count in self.reductions[i].removed.items())})")
+
+        try:
+            # Pick the solving method of each instance up front, so that the choices can be reported whichever process solves them
+            self.selected_methods = [method] * len(self.problems)
+            if method == "auto":
+                for i in unsolved:
+                    self.selected_methods[i] = selectMethod(*self.problems[i], self.memory_budget)
+                    self.stats[i].method = self.selected_methods[i]
+
+            if workers is not None and workers > 1:
+                self.__solveInParallel(self.selected_methods, verbosity, workers, unsolved, solutions, original_problems)
+            else:
+                # Delegate to the function that uses the specified solving method
+                for i in unsolved:
+                    start = time.perf_counter()
+                    problem_instance_solution = self.SOLVER_METHODS[self.selected_methods[i]](i)
+                    end = time.perf_counter()
+                    solutions[i] = sorted(problem_instance_solution)
+                    self.stats[i].elapsed = end - start
+                    self.__finishInstance(i, solutions, original_problems[i][1])
+                    if verbosity == 1:
+                        print(f"Solved {i + 1}/{len(self.problems)} ({'%.3f' % (end - start)} sec"
+                              f"{', ' + self.selected_methods[i] if method == 'auto' else ''}"
+                              f"{'' if self.stats[i].optimal else ', stopped early'})")
+        finally:
+            self.problems = original_problems
+
+        # Only optimal solutions are worth caching
+        if cache is not None:
+            for i in unsolved:
+                if self.stats[i].optimal:
+                    cache.store(*self.problems[i], solutions[i])
+
+        # Return a list of solutions for the whole file
+        if return_stats:
+            return solutions, self.stats
         return solutions
 
+    def __finishInstance(self, problem_index, solutions, items):
+        '''Complete the solution and stats of a problem instance that has just been solved, and report the stats to the hooks.
+
+        items are the instance's items from before any reduction.'''
+
+        # Add the items that the reduction fixed into the knapsack back into the solution
+        fixed_value = 0
+        reduction = self.reductions[problem_index]
+        if reduction is not None:
+            solutions[problem_index] = sorted(solutions[problem_index] + reduction.fixed_names)
+            fixed_value = _solutionValue(items, reduction.fixed_names)
+
+        # Methods that ran to completion leave the upper bound to be filled in with the optimal value
+        stats = self.stats[problem_index]
+        stats.best_value = _solutionValue(items, solutions[problem_index])
+        stats.upper_bound = stats.best_value if stats.upper_bound is None else stats.upper_bound + fixed_value
+        stats.optimal = stats.upper_bound == stats.best_value
+        self.__reportStats(problem_index)
+
+    def __reportStats(self, problem_index):
+        for hook in self.stats_hooks:
+            hook(problem_index, self.stats[problem_index])
+
+    def __budget(self):
+        '''Return the (deadline, node_limit) of a search that starts now; either may be None, for no limit.'''
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        return deadline, self.node_limit
+
+    def __instanceStats(self, problem_index):
+        '''Return the SolverStats that a solving method should fill in for the given problem instance.'''
+
+        # The solving methods can also be called directly, without getSolutions setting up the stats first
+        if len(self.stats) != len(self.problems):
+            self.stats = [SolverStats() for i in range(len(self.problems))]
+        return self.stats[problem_index]
+
+    def __solveInParallel(self, methods, verbosity, workers, problem_indices, solutions, original_problems):
+        '''Solve the specified problem instances, fanning them out to a pool of worker processes, and fill in their solutions.
+
+        methods holds the solving method of every problem instance, and original_problems every instance from before any reduction.'''
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+
+            # Send each worker only the capacity, the item names and compact arrays of the item values and weights
+            futures = dict()
+            for i in problem_indices:
+                capacity, items = self.problems[i]
+                names = [item[0] for item in items]
+                values = array('q', [item[1] for item in items])
+                weights = array('q', [item[2] for item in items])
+                futures[executor.submit(_solveProblem, methods[i], capacity, names, values, weights,
+                                        self.time_limit, self.node_limit, self.epsilon, self.search_workers,
+                                        self.memory_budget, self.warm_starts.get(i))] = i
+
+            # Collect the solutions as they finish, keeping them in the same order as the problems
+            for num_solved, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                solutions[i], self.stats[i] = future.result()
+                self.__finishInstance(i, solutions, original_problems[i][1])
+                elapsed = self.stats[i].elapsed
+                if verbosity == 1:
+                    print(f"Solved {num_solved}/{len(problem_indices)} (problem {i + 1}, {'%.3f' % elapsed} sec, {methods[i]})")
+
     def __solveBruteForce(self, problem_index):
-        '''Solve using a brute force implementation. 
-        
-        The general idea for this implementation comes from http://www.micsymposium.org/mics_2005/papers/paper102.pdf'''
+        '''Solve using a brute force implementation that enumerates every subset of the items.
+
+        Subsets are enumerated as integer bitmasks in Gray-code order, so that each step adds or removes a single item.
+        The lowest-indexed items form a fixed-size chunk whose weights and values are computed once with numpy;
+        the rest of the items are then enumerated one at a time, and each whole chunk is checked against them at once.'''
+        import numpy as np
+        from concurrent.futures import ProcessPoolExecutor
 
         # Constants for this problem instance
         capacity = self.problems[problem_index][0]
         items = self.problems[problem_index][1]
-        num_items = len(items)
+        values = np.array([item[1] for item in items], dtype=np.int64)
+        weights = np.array([item[2] for item in items], dtype=np.int64)
+        chunk_bits = min(len(items), BRUTE_FORCE_CHUNK_BITS)
+        stats = self.__instanceStats(problem_index)
+        deadline, node_limit = self.__budget()
 
-        # Variable to track of the highest value so far
-        best_value = -1
+        # A greedy solution to fall back on, in case the search runs out of budget before finding anything better
+        greedy_value, greedy_mask, root_bound = _greedyAndBound(capacity, items)
 
-        # A numpy array that represents a binary number that increments each time through the loop
-        chosen_arr = np.zeros(num_items)
+        # Search the entire range of subsets of the items outside the chunk, split into one contiguous shard per worker
+        num_outer = 2**(len(items) - chunk_bits)
+        num_shards = min(self.search_workers, num_outer)
+        bounds = [num_outer * k // num_shards for k in range(num_shards + 1)]
+        with stats.timePhase("enumeration"):
+            if num_shards == 1:
+                best_value, best_mask, num_searched, num_pruned = _bruteForceRange(
+                    capacity, values, weights, chunk_bits, 0, num_outer, deadline, node_limit)
+            else:
+                # Each shard gets an equal part of the node budget
+                shard_node_limit = None if node_limit is None else max(1, node_limit // num_shards)
+                with ProcessPoolExecutor(max_workers=num_shards) as executor:
+                    shard_results = list(executor.map(_bruteForceRange, *zip(*[
+                        (capacity, values, weights, chunk_bits, bounds[k], bounds[k + 1], deadline, shard_node_limit)
+                        for k in range(num_shards)])))
 
-        # Loop 2^n times
-        for i in range(0, 2**num_items):
-            
-            # Reset variables that will be used below
-            j = num_items - 1
-            temp_weight = 0
-            temp_value = 0
-            
-            # Increment the binary number that chosen_arr represents
-            while (chosen_arr[j] != 0 and j >= 0):
-                chosen_arr[j] = 0
-                j -= 1
-            chosen_arr[j] = 1
-
-            # Add up the values and weights of the chosen items
-            for k in range(0, num_items):
-                if chosen_arr[k] == 1:
-                    temp_weight += items[k][2] # Indices meaning: which item, item weight
-                    temp_value += items[k][1] # Indices meaning: which item, item value
-            
-            # If this is the best legal value so far, update variables accordingly
-            if temp_value > best_value and temp_weight <= capacity:
-                best_value = temp_value
-                best_choice = np.copy(chosen_arr)
-        
-        # Convert binary list to a list of chosen item names; return it
-        return [item[0] for item, bit in zip(items, best_choice) if bit]
+                # Shards are reduced in order, keeping the first best one, so the result matches a single-process search
+                best_value, best_mask, num_searched, num_pruned = -1, 0, 0, 0
+                for shard_value, shard_mask, shard_searched, shard_pruned in shard_results:
+                    num_searched += shard_searched
+                    num_pruned += shard_pruned
+                    if shard_value > best_value:
+                        best_value, best_mask = shard_value, shard_mask
+
+        stats.subset_counts["enumerated"] = num_searched * 2**chunk_bits
+        stats.nodes_expanded = num_searched - num_pruned
+        stats.nodes_pruned = num_pruned
+
+        # If the search stopped early, fall back on the greedy solution if it's better, and report the root bound
+        if num_searched < num_outer:
+            stats.optimal = False
+            stats.upper_bound = root_bound
+            if greedy_value > best_value:
+                best_value, best_mask = greedy_value, greedy_mask
+
+        # Convert bitmask to a list of chosen item names; return it
+        return [item[0] for i, item in enumerate(items) if best_mask >> i & 1]
     
     def __solveBacktrack(self, problem_index):
         '''Solve using an iterative backtracking implementation.'''
@@ -119,156 +395,382 @@ class Solver:
         items = self.problems[problem_index][1]
         num_items = len(items)
         
-        # Variables to track the highest value so far and the corresponding items
+        # Variables to track the highest value so far and the corresponding items, as a bitmask with bit i set if item i is chosen
         best_value = -1
-        best_choice = []
+        best_choice = 0
 
-        # Create a stack of "knapsack situations," each of which is a (curr_pack_indices: [], next_index, curr_value, curr_weight) tuple.
+        # Counters for this instance's SolverStats; the stack depth is tracked by hand, since Stack has no size
+        nodes_expanded = nodes_pruned = depth = max_depth = 0
+
+        # A greedy solution to fall back on, in case the search runs out of budget before finding anything better
+        greedy_value, greedy_choice, root_bound = _greedyAndBound(capacity, items)
+        deadline, node_limit = self.__budget()
+        next_budget_check = _nextBudgetCheck(0, node_limit)
+        stopped_early = False
+
+        # Create a stack of "knapsack situations," each of which is a (curr_pack_mask, next_index, curr_value, curr_weight) tuple.
         # Push to it an empty knapsack where all the items starting with index 0 are still fair game for adding
         stack = Stack()
-        stack.push(([], 0, 0, 0))
+        if num_items:
+            stack.push((0, 0, 0, 0))
+            depth = max_depth = 1
         
         # Iterate until we've addressed all hypothetical knapsack situations
         while not stack.is_empty():
 
+            # Every so often, stop if the budget has run out
+            if nodes_expanded >= next_budget_check:
+                if _budgetExhausted(nodes_expanded, deadline, node_limit):
+                    stopped_early = True
+                    break
+                next_budget_check = _nextBudgetCheck(nodes_expanded, node_limit)
+
             # Pop a knapsack situation 
-            curr_pack_indices, next_index, curr_value, curr_weight = stack.pop()
+            curr_pack_mask, next_index, curr_value, curr_weight = stack.pop()
+            depth -= 1
+            nodes_expanded += 1
             
             # The next item to cause situation branching by being added or not
             next_item = items[next_index] 
             
             # The variables representing the situation in which this next item is added
-            pack_indices_with_next_item = curr_pack_indices + [next_index]
+            pack_mask_with_next_item = curr_pack_mask | (1 << next_index)
             next_weight = curr_weight + next_item[2]
             next_value = curr_value + next_item[1]
 
             # If this is the best legal value so far, update variables accordingly
             if next_weight <= capacity and next_value > best_value:
                 best_value = next_value
-                best_choice = pack_indices_with_next_item
+                best_choice = pack_mask_with_next_item
             
             # If there are still more items remaining to add or not add, push those situations to the situation stack
             if next_index <= num_items - 2:
                 
                 # Here's the backtracking!!! Only push the situation with this item added if it doesn't put the knapsack over capacity
                 if next_weight < capacity:
-                    stack.push((pack_indices_with_next_item,
+                    stack.push((pack_mask_with_next_item,
                                 next_index + 1, next_value, next_weight))
+                    depth += 1
+                else:
+                    nodes_pruned += 1
                 
                 # Regardless of that next item's weight, push the situation in which it wasn't added
-                stack.push((curr_pack_indices, next_index + 1, 
+                stack.push((curr_pack_mask, next_index + 1, 
                             curr_value, curr_weight))
+                depth += 1
+                if depth > max_depth:
+                    max_depth = depth
+
+        stats = self.__instanceStats(problem_index)
+        stats.nodes_expanded = nodes_expanded
+        stats.nodes_pruned = nodes_pruned
+        stats.max_stack_depth = max_depth
+
+        # If the search stopped early, fall back on the greedy solution if it's better, and report the root bound
+        if stopped_early:
+            stats.optimal = False
+            stats.upper_bound = root_bound
+            if greedy_value > best_value:
+                best_value, best_choice = greedy_value, greedy_choice
         
-        # Convert list of chosen item indices to a list of chosen item names; return it
-        return [items[i][0] for i in best_choice]
+        # Convert bitmask to a list of chosen item names; return it
+        return [item[0] for i, item in enumerate(items) if best_choice >> i & 1]
 
     def __solveBranchAndBound(self, problem_index):
-        '''Solve using an iterative branch and bound implementation.'''
+        '''Solve using an iterative, depth-first branch and bound implementation.
+
+        Items are considered in order of decreasing value/weight ratio, so that the Dantzig (fractional knapsack)
+        bound of each knapsack situation can be found with a binary search over prefix sums. The search starts
+        from a greedy solution, and skips every subtree whose bound can't beat the best value so far.'''
 
         # Constants for this problem instance
         capacity = self.problems[problem_index][0]
         items = self.problems[problem_index][1]
         num_items = len(items)
 
-        # Variables to track the highest value so far and the corresponding items
-        best_value = -1
-        best_choice_complement = [] # That is, the indices of the items that are NOT in the knapsack in the best case so far
+        # Sort the items by decreasing value/weight ratio; weightless items go first
+        order = sorted(range(num_items), reverse=True,
+                       key=lambda i: items[i][1] / items[i][2] if items[i][2] else float('inf'))
+        values = [items[i][1] for i in order]
+        weights = [items[i][2] for i in order]
+        prefix_values = [0]
+        prefix_weights = [0]
+        for value, weight in zip(values, weights):
+            prefix_values.append(prefix_values[-1] + value)
+            prefix_weights.append(prefix_weights[-1] + weight)
+
+        # Seed the best value so far with a greedy solution: add each item, in ratio order, if it still fits
+        best_value = 0
+        best_choice = 0 # That is, a bitmask with bit k set if the item at position k in the sorted order is in the knapsack in the best case so far
+        greedy_weight = 0
+        for k in range(num_items):
+            if greedy_weight + weights[k] <= capacity:
+                greedy_weight += weights[k]
+                best_value += values[k]
+                best_choice |= 1 << k
+
+        # A warm start replaces the greedy solution if it is feasible for this instance and worth more
+        warm_start = self.warm_starts.get(problem_index)
+        if warm_start is not None:
+            position = {items[order[k]][0]: k for k in range(num_items)}
+            if (all(name in position for name in warm_start) and len(set(warm_start)) == len(warm_start)
+                    and sum(weights[position[name]] for name in warm_start) <= capacity):
+                warm_value = sum(values[position[name]] for name in warm_start)
+            else:
+                warm_value = -1
+            if warm_value > best_value:
+                best_value = warm_value
+                best_choice = sum(1 << position[name] for name in warm_start)
 
-        # Create a stack of "knapsack situations," each of which is a (removed_items_indices: [], next_index, curr_value, curr_weight) tuple. 
-        # Push to it a full knapsack where all the items starting with index 0 are still fair game for removing
+        def bound(next_index, curr_value, curr_weight):
+            '''Fill the remaining capacity with whole items in ratio order, then with a fraction of the first item that doesn't fit.'''
+            fill_weight = prefix_weights[next_index] + capacity - curr_weight
+            last_whole = bisect_right(prefix_weights, fill_weight, next_index) - 1
+            node_bound = curr_value + prefix_values[last_whole] - prefix_values[next_index]
+            if last_whole < num_items:
+                node_bound += (fill_weight - prefix_weights[last_whole]) * values[last_whole] / weights[last_whole]
+            return node_bound
+
+        # Counters for this instance's SolverStats; the stack depth is tracked by hand, since Stack has no size
+        nodes_expanded = nodes_pruned = 0
+        depth = max_depth = 1
+        deadline, node_limit = self.__budget()
+        next_budget_check = _nextBudgetCheck(0, node_limit)
+        stopped_early = False
+
+        # Create a stack of "knapsack situations," each of which is a (curr_pack_mask, next_index, curr_value, curr_weight) tuple.
+        # Push to it an empty knapsack where all the items starting with index 0 are still fair game for adding
         stack = Stack()
-        stack.push(([], 0, sum(item[1] for item in items), 
-                    sum(item[2] for item in items)))
-        
+        stack.push((0, 0, 0, 0))
+
         # Iterate until we've addressed all hypothetical knapsack situations
         while not stack.is_empty():
-            
-            # Pop a knapsack situation
-            removed_items_indices, next_index, curr_value, curr_weight = stack.pop()
-            
-            # The next item to cause situation branching by being removed or not
-            next_item = items[next_index]
-            
-            # The variables representing the situation in which this next item is removed
-            removed_indices_with_next_item = removed_items_indices + \
-                [next_index]
-            next_weight = curr_weight - next_item[2]
-            next_value = curr_value - next_item[1]
-            still_overweight = next_weight > capacity
-            next_is_best_value = next_value > best_value
 
-            # If this is the best legal value so far, update variables accordingly
-            if not still_overweight and next_is_best_value:
-                best_value = next_value
-                best_choice_complement = removed_indices_with_next_item
-            
-            # If there are still more items remaining to remove or not remove, push those situations to the situation stack
-            if next_index <= num_items - 2:
-                
-                # Here's the bounding!!! Not interested in the subtree resulting from removing next_item 
-                # if doing so puts us below the weight threshold or below the best value so far, 
-                # since removing more items in addition to that one won't help in either of those cases.
-                if still_overweight and next_is_best_value: 
-                    stack.push((removed_indices_with_next_item, 
-                                next_index + 1, next_value, next_weight))
-                
-                # Regardless of that next item's weight and value, push the situation in which it wasn't removed
-                stack.push((removed_items_indices, next_index + 1, 
-                            curr_value, curr_weight))
-        
-        # Convert list of *non-chosen* item indices to a list of *chosen* item names; return it
-        return [items[i][0] for i in range(num_items) if i not in best_choice_complement]
+            # Every so often, stop if the budget has run out
+            if nodes_expanded >= next_budget_check:
+                if _budgetExhausted(nodes_expanded, deadline, node_limit):
+                    stopped_early = True
+                    break
+                next_budget_check = _nextBudgetCheck(nodes_expanded, node_limit)
+
+            # Pop a knapsack situation; every situation on the stack fits in the knapsack
+            curr_pack_mask, next_index, curr_value, curr_weight = stack.pop()
+            depth -= 1
+            nodes_expanded += 1
+
+            # If this is the best value so far, update variables accordingly
+            if curr_value > best_value:
+                best_value = curr_value
+                best_choice = curr_pack_mask
+
+            if next_index == num_items:
+                continue
+
+            # Here's the bounding!!! No packing of the remaining items can be worth more than the fractional knapsack bound
+            if bound(next_index, curr_value, curr_weight) <= best_value:
+                nodes_pruned += 1
+                continue
+
+            # Push the situation in which the next item isn't added, then the one in which it is (if it fits), so that one is explored first
+            stack.push((curr_pack_mask, next_index + 1, curr_value, curr_weight))
+            depth += 1
+            if curr_weight + weights[next_index] <= capacity:
+                stack.push((curr_pack_mask | (1 << next_index), next_index + 1,
+                            curr_value + values[next_index], curr_weight + weights[next_index]))
+                depth += 1
+            if depth > max_depth:
+                max_depth = depth
+
+        stats = self.__instanceStats(problem_index)
+        stats.nodes_expanded = nodes_expanded
+        stats.nodes_pruned = nodes_pruned
+        stats.max_stack_depth = max_depth
+
+        # If the search stopped early, every unexplored subtree is still on the stack, so the highest of their bounds
+        # (or the best value so far) bounds the optimal value
+        if stopped_early:
+            stats.optimal = False
+            stats.upper_bound = best_value
+            while not stack.is_empty():
+                stats.upper_bound = max(stats.upper_bound, int(bound(*stack.pop()[1:]) + 1e-9))
+
+        # Convert bitmask of sorted positions to a list of chosen item names; return it
+        return [items[order[k]][0] for k in range(num_items) if best_choice >> k & 1]
 
     def __solveMiddle(self, problem_index):
         '''Solve using a Meet in the Middle implementation. 
 
-        The general idea for this implementation comes from https://en.wikipedia.org/wiki/Knapsack_problem#Meet-in-the-middle'''
+        The general idea for this implementation comes from https://en.wikipedia.org/wiki/Knapsack_problem#Meet-in-the-middle
+        Each half's subsets are kept as parallel numpy arrays of values, weights and bitmasks. The second half is pruned down
+        to its Pareto frontier, so every subset of the first half can be matched against it with a single binary search.'''
+        import numpy as np
 
-        #count = 0
+        # Constants for this problem instance
         capacity = self.problems[problem_index][0]
         items = self.problems[problem_index][1]
+        values = np.array([item[1] for item in items], dtype=np.int64)
+        weights = np.array([item[2] for item in items], dtype=np.int64)
 
-        #Partition the list of items into two approximately equal sized lists
-        items_a, items_b = np.array_split(items, 2)
-
-        #Find the power set of each list
-        subsets_a = self.findSubsets(items_a)
-        subsets_b = self.findSubsets(items_b)
-       
-        #Sort b's subsets
-        subsets_b_python_list = list(subsets_b)
-        subsets_b_python_list.sort(key = lambda x: x[2])
-        subsets_b = np.array(subsets_b_python_list)
-        
-        best_set = []
-        for sub_a, a_values, a_weight in subsets_a:
-       
-            sub_best_values = -1
-            #Remember the highest value subset for each subset in subsets_a
-            good_set = []
-            for sub_b, b_values, b_weight in subsets_b:
-                
-                if a_values + b_values > sub_best_values and a_weight + b_weight <= capacity:
-                    sub_best_values = a_values + b_values
-                    good_set = np.concatenate((sub_a, sub_b))
-                elif a_weight + b_weight > capacity:
-                    break
-            #Update the best set
-            if self.sumValues(good_set) > self.sumValues(best_set):
-               
-                best_set = np.copy(good_set)
+        stats = self.__instanceStats(problem_index)
+
+        # Partition the items into two approximately equal sized halves, and find the power set of each
+        half = (len(items) + 1) // 2
+        with stats.timePhase("enumeration"):
+            a_values, a_weights, a_masks = _grayCodeSums(values[:half], weights[:half])
+            b_subsets = _grayCodeSums(values[half:], weights[half:])
+        with stats.timePhase("frontier"):
+            b_values, b_weights, b_masks = _paretoFrontier(*b_subsets)
+        stats.subset_counts.update(half_a=len(a_values), half_b=len(b_subsets[0]), frontier=len(b_values))
+        del b_subsets
+
+        # Match every subset of the first half with the best subset of the second half that fits alongside it
+        with stats.timePhase("matching"):
+            if self.search_workers > 1:
+                best_value, a_index, b_index = _matchHalvesInParallel(capacity, a_values, a_weights, b_values, b_weights,
+                                                                      self.search_workers)
+            else:
+                best_value, a_index, b_index = _matchHalves(capacity, a_values, a_weights, b_values, b_weights)
+        best_mask = int(a_masks[a_index]) | (int(b_masks[b_index]) << half)
+
+        # Convert bitmask to a list of chosen item names; return it
+        return [item[0] for i, item in enumerate(items) if best_mask >> i & 1]
+
+    def __solveSchroeppelShamir(self, problem_index):
+        '''Solve using the Schroeppel-Shamir variant of Meet in the Middle, which needs memory for only O(2^(n/4)) subsets.
+
+        The items are split into four quarters, and each quarter's subsets are pruned down to their Pareto frontier.
+        Pairs of subsets from the first two quarters are then generated in decreasing order of weight, and pairs from
+        the last two in increasing order, a chunk at a time. As the first stream gets lighter, more of the second
+        stream fits alongside it, so a single pass over both streams matches every pair with its best partner.'''
+        import numpy as np
+
+        # Constants for this problem instance
+        capacity = self.problems[problem_index][0]
+        items = self.problems[problem_index][1]
+        values = np.array([item[1] for item in items], dtype=np.int64)
+        weights = np.array([item[2] for item in items], dtype=np.int64)
 
-        return [best_set[i][0] for i in range(len(best_set))]
+        stats = self.__instanceStats(problem_index)
+
+        # Partition the items into four approximately equal sized quarters, and find the Pareto frontier of each one's power set
+        bounds = [len(items) * k // 4 for k in range(5)]
+        quarters = []
+        for k in range(4):
+            with stats.timePhase("enumeration"):
+                subsets = _grayCodeSums(values[bounds[k]:bounds[k + 1]], weights[bounds[k]:bounds[k + 1]])
+            with stats.timePhase("frontier"):
+                quarters.append(_paretoFrontier(*subsets))
+            stats.subset_counts[f"quarter_{k + 1}"] = len(subsets[0])
+        del subsets
+        stats.subset_counts["frontiers"] = sum(len(quarter[0]) for quarter in quarters)
+
+        # Stream the first half heaviest first, by walking the frontiers from their heavy ends with their weights negated
+        first_half = [(quarter_values[::-1], -quarter_weights[::-1], quarter_masks[::-1])
+                      for quarter_values, quarter_weights, quarter_masks in quarters[:2]]
+        a_chunks = ((a_values, -a_weights, a_masks) for a_values, a_weights, a_masks
+                    in _pairSumsByWeight(*first_half, bounds[1], SCHROEPPEL_SHAMIR_CHUNK_SIZE))
+        b_chunks = _pairSumsByWeight(*quarters[2:], bounds[3] - bounds[2], SCHROEPPEL_SHAMIR_CHUNK_SIZE)
+
+        with stats.timePhase("matching"):
+            best_value, a_mask, b_mask = _matchWeightStreams(capacity, a_chunks, b_chunks)
+        best_mask = a_mask | (b_mask << bounds[2])
+
+        # Convert bitmask to a list of chosen item names; return it
+        return [item[0] for i, item in enumerate(items) if best_mask >> i & 1]
+
+    def __solveDynamicProgramming(self, problem_index):
+        '''Solve using a capacity-indexed dynamic programming implementation, in O(n * capacity) time.
+
+        Each item's row update is vectorized with numpy, and the per-item choices are kept as packed bits so that
+        the chosen items can be reconstructed without an n by capacity table of Python objects.'''
+        import numpy as np
+
+        # Constants for this problem instance
+        capacity = self.problems[problem_index][0]
+        items = self.problems[problem_index][1]
+        num_items = len(items)
+
+        # best_values[w] is the highest value achievable with total weight at most w, using the items seen so far
+        best_values = np.zeros(capacity + 1, dtype=np.int64)
+
+        # Row i holds one bit per capacity w, set if item i was taken when computing best_values[w]
+        choices = np.zeros((num_items, (capacity + 8) // 8), dtype=np.uint8)
+        stats = self.__instanceStats(problem_index)
+
+        with stats.timePhase("table"):
+            for i, (name, value, weight) in enumerate(items):
+                choices[i] = _addItemToTable(best_values, value, weight)
+
+        # Walk back through the choice rows to recover which items produced best_values[capacity]
+        with stats.timePhase("reconstruction"):
+            chosen = _chosenFromTable(choices, [item[2] for item in items], capacity)
+        return [items[i][0] for i in chosen]
+
+    def __solveMinWeightDynamicProgramming(self, problem_index):
+        '''Solve using a value-indexed dynamic programming implementation, in O(n * total value) time.
+
+        Rather than the best value for each capacity, the table holds the lowest weight for each total value, so its
+        size doesn't depend on the capacity at all; this suits instances with huge weights and capacities but small values.'''
+        import numpy as np
+
+        # Constants for this problem instance
+        capacity = self.problems[problem_index][0]
+        items = self.problems[problem_index][1]
+        values = np.array([item[1] for item in items], dtype=np.int64)
+        weights = np.array([item[2] for item in items], dtype=np.int64)
+
+        chosen, best_value = _minWeightChoices(capacity, values, weights, self.__instanceStats(problem_index))
+        return [items[i][0] for i in chosen]
+
+    def __solveFptas(self, problem_index):
+        '''Solve approximately, to within a factor of (1 - self.epsilon) of the optimal value, in O(n^3 / epsilon) time.
+
+        This is the classic fully polynomial-time approximation scheme: the item values are divided by a scale of
+        epsilon * (highest value) / n and rounded down, and the scaled instance is solved exactly by value-indexed dynamic
+        programming. Rounding loses less than the scale per chosen item, which bounds the optimal value from above.'''
+        import numpy as np
+
+        # Constants for this problem instance
+        capacity = self.problems[problem_index][0]
+        items = self.problems[problem_index][1]
+        values = np.array([item[1] for item in items], dtype=np.int64)
+        weights = np.array([item[2] for item in items], dtype=np.int64)
+
+        stats = self.__instanceStats(problem_index)
+
+        # Only the items that fit on their own, and are worth something, count towards the scale
+        usable = (weights <= capacity) & (values > 0)
+        num_usable = int(usable.sum())
+        if num_usable == 0:
+            return []
+
+        # A whole-number scale keeps the bound exact; at a scale of 1, the scaled instance is the original one
+        scale = max(1, int(self.epsilon * int(values[usable].max()) / num_usable))
+        chosen, scaled_value = _minWeightChoices(capacity, values // scale, weights, stats)
+
+        if scale > 1:
+            # Every item is worth at most scale - 1 more than its scaled value times the scale
+            best_value = int(values[chosen].sum())
+            stats.upper_bound = min(scale * scaled_value + num_usable * (scale - 1), _greedyAndBound(capacity, items)[2])
+            stats.upper_bound = max(stats.upper_bound, best_value)
+        return [items[i][0] for i in chosen]
+
+    def __solveAuto(self, problem_index):
+        '''Solve using whichever method selectMethod picks for this problem instance.'''
+        method = selectMethod(*self.problems[problem_index], self.memory_budget)
+        self.__instanceStats(problem_index).method = method
+        return self.SOLVER_METHODS[method](problem_index)
 
     def findSubsets(self, items):
         '''Return the list of all non-empty subsets of a given list.'''
+        import numpy as np
 
         sub_list = []
         #Iteration begins at 1 because we don't need the empty set
         for i in range(1, len(items)+1):
             for subset in combinations(items, i):
                 sub_list.append((subset, self.sumValues(subset), self.sumWeights(subset)))
-        return np.array(sub_list)
+        return np.array(sub_list, dtype=object)
 
     def sumWeights(self, items):
         '''Return the sum of the weights of the given list of items.'''
@@ -285,8 +787,828 @@ class Solver:
             sum += int(items[i][1])
         return sum
 
-def solveKnapsackFile(filename, method="meetInMiddle", verbosity=0):
+class IncrementalProblem:
+    '''A single Knapsack Problem instance that can be edited and solved again, reusing what it can from its previous solves.
+
+    The last solution is kept, and repaired to stay feasible through every edit, along with an upper bound on the optimal
+    value that every edit keeps valid. Whenever the kept solution reaches the bound (say, after removing an item that
+    wasn't in it), it is returned without solving anything. Otherwise, the dynamicProgramming method adds one table row per
+    added item, and reuses its table outright for any lower capacity; the meetInMiddle method keeps both halves' subset
+    arrays, only rebuilding the half that an edit touches, and rematches them for a new capacity; and branchAndBound
+    starts its search from the kept solution. Every other method solves from scratch. Item names must be unique.'''
+
+    __slots__ = ("capacity", "items", "solution", "stats", "__solution_value", "__upper_bound", "__table", "__halves")
+
+    def __init__(self, capacity, items=()):
+        self.capacity = capacity
+
+        # Dict that maps each item name to its (value, weight), in the order the items were added
+        self.items = dict()
+
+        # The last solution (kept feasible through edits), its value, and an upper bound on the optimal value; with no items, the empty solution is optimal
+        self.solution = []
+        self.stats = None
+        self.__solution_value = 0
+        self.__upper_bound = 0
+
+        # Reusable solver state: the (names, best_values, choice rows) of the dynamic programming table, and the
+        # (names, values, weights, masks) of the meet in the middle halves, the second of which is pruned to its Pareto frontier
+        self.__table = None
+        self.__halves = None
+
+        for name, value, weight in items:
+            self.add_item(name, value, weight)
+
+    def itemList(self):
+        '''Return the items as a list of (name, value, weight) tuples.'''
+        return [(name, value, weight) for name, (value, weight) in self.items.items()]
+
+    def add_item(self, name, value, weight):
+        if name in self.items:
+            raise ValueError(f"There is already an item named {name!r}")
+        self.items[name] = (value, weight)
+
+        # The new item can add at most its own value to the optimum
+        if self.__upper_bound is not None and weight <= self.capacity:
+            self.__upper_bound += value
+
+        if self.__table is not None:
+            names, best_values, choices = self.__table
+            names.append(name)
+            choices.append(_addItemToTable(best_values, value, weight))
+
+        # Add the item to the smaller half, doubling its subsets
+        if self.__halves is not None:
+            import numpy as np
+            k = 0 if len(self.__halves[0][0]) <= len(self.__halves[1][0]) else 1
+            names, values, weights, masks = self.__halves[k]
+            subsets = (np.concatenate((values, values + value)), np.concatenate((weights, weights + weight)),
+                       np.concatenate((masks, masks | (1 << len(names)))))
+            self.__halves[k] = (names + [name], *(_paretoFrontier(*subsets) if k == 1 else subsets))
+
+    def remove_item(self, name):
+        value, weight = self.items.pop(name)
+
+        # Removing an item can't raise the optimum, and the kept solution stays feasible without it
+        if name in self.solution:
+            self.solution.remove(name)
+            self.__solution_value -= value
+
+        # The table rows after the item's would all change, so the table is rebuilt on the next solve
+        self.__table = None
+
+        if self.__halves is not None:
+            k = 0 if name in self.__halves[0][0] else 1
+            self.__halves[k] = self.__buildHalf(k, [other for other in self.__halves[k][0] if other != name])
+
+    def updateItem(self, name, value, weight):
+        '''Change the value and weight of an item, e.g. to reprice it.'''
+        self.remove_item(name)
+        self.add_item(name, value, weight)
+
+    def set_capacity(self, capacity):
+        if capacity > self.capacity:
+            # There's no cheap bound on how much more a bigger knapsack holds
+            self.__upper_bound = None
+        else:
+            # A smaller knapsack can't hold more; drop items from the kept solution, lowest value/weight ratio first, until it fits
+            weight = sum(self.items[name][1] for name in self.solution)
+            for name in sorted(self.solution, key=lambda name: self.items[name][0] / self.items[name][1] if self.items[name][1] else float('inf')):
+                if weight <= capacity:
+                    break
+                self.solution.remove(name)
+                self.__solution_value -= self.items[name][0]
+                weight -= self.items[name][1]
+        self.capacity = capacity
+
+    def solve(self, method="auto", **options):
+        '''Solve the problem as it stands, using the specified solving method; return the sorted solution.
+
+        Any options, such as time_limit or epsilon, are passed on to Solver.getSolutions by the methods that solve from scratch.
+        The SolverStats of the solve are kept in self.stats; stats.cached is True if the kept solution was returned as is.'''
+
+        items = self.itemList()
+        if method == "auto":
+            method = selectMethod(self.capacity, items)
+
+        stats = SolverStats(method)
+        start = time.perf_counter()
+        if self.__upper_bound is not None and self.__solution_value >= self.__upper_bound:
+            stats.cached = True
+            solution = self.solution
+            stats.best_value = stats.upper_bound = self.__upper_bound
+        elif method == "dynamicProgramming":
+            solution = self.__solveWithTable(stats)
+        elif method == "meetInMiddle":
+            solution = self.__solveWithHalves(stats)
+        else:
+            solver = Solver()
+            solver.problems = [(self.capacity, items)]
+            solutions, all_stats = solver.getSolutions(method, return_stats=True, warm_starts={0: list(self.solution)}, **options)
+            solution, stats = solutions[0], all_stats[0]
+
+        # The methods that reuse state always run to completion
+        if stats.best_value is None:
+            stats.best_value = stats.upper_bound = sum(self.items[name][0] for name in solution)
+        stats.optimal = stats.upper_bound == stats.best_value
+        stats.elapsed = time.perf_counter() - start
+
+        self.solution = sorted(solution)
+        self.__solution_value = stats.best_value
+        self.__upper_bound = stats.upper_bound
+        self.stats = stats
+        return list(self.solution)
+
+    def __solveWithTable(self, stats):
+        # The table can be reused for any capacity up to the one it was built for
+        import numpy as np
+        if self.__table is None or len(self.__table[1]) <= self.capacity:
+            with stats.timePhase("table"):
+                names = list(self.items)
+                best_values = np.zeros(self.capacity + 1, dtype=np.int64)
+                choices = [_addItemToTable(best_values, *self.items[name]) for name in names]
+                self.__table = (names, best_values, choices)
+        names, best_values, choices = self.__table
+        with stats.timePhase("reconstruction"):
+            chosen = _chosenFromTable(choices, [self.items[name][1] for name in names], self.capacity)
+        return [names[i] for i in chosen]
+
+    def __solveWithHalves(self, stats):
+        if self.__halves is None:
+            with stats.timePhase("enumeration"):
+                names = list(self.items)
+                half = (len(names) + 1) // 2
+                self.__halves = [self.__buildHalf(0, names[:half]), self.__buildHalf(1, names[half:])]
+        (a_names, a_values, a_weights, a_masks), (b_names, b_values, b_weights, b_masks) = self.__halves
+        with stats.timePhase("matching"):
+            best_value, a_index, b_index = _matchHalves(self.capacity, a_values, a_weights, b_values, b_weights)
+        if a_index < 0:
+            return []
+        return ([name for i, name in enumerate(a_names) if int(a_masks[a_index]) >> i & 1]
+                + [name for i, name in enumerate(b_names) if int(b_masks[b_index]) >> i & 1])
+
+    def __buildHalf(self, k, names):
+        '''Return the (names, values, weights, masks) of every subset of the named items, pruned to the Pareto frontier if k is 1.'''
+        import numpy as np
+        values = np.array([self.items[name][0] for name in names], dtype=np.int64)
+        weights = np.array([self.items[name][1] for name in names], dtype=np.int64)
+        subsets = _grayCodeSums(values, weights)
+        return (names, *(_paretoFrontier(*subsets) if k == 1 else subsets))
+
+
+def solveKnapsackFile(filename, method="auto", verbosity=0, workers=None, cache=None, reduce=False):
     '''A wrapper function for solving the problems in a file; load the file into a Solver instance and get the solutions using the specified method.'''
     solver = Solver()
     solver.loadProblemFromFile(filename)
-    return solver.getSolutions(method, verbosity)
+    return solver.getSolutions(method, verbosity, workers, cache, reduce)
+
+
+def solveCapacities(items, capacities, method="auto", return_values=False, memory_budget=AUTO_MEMORY_BUDGET):
+    '''Solve one list of (name, value, weight) items for each of the given capacities; return the list of sorted solutions,
+    in the same order as the capacities, along with the list of their values if return_values is True.
+
+    The dynamicProgramming and minWeightDynamicProgramming methods build a single table for the largest capacity, and read
+    every capacity's solution from it; meetInMiddle builds both halves' subset arrays once, and matches them against each
+    capacity with one vectorized binary search. Every other method solves the capacities one after another. If method is
+    "auto", the sweep uses whichever of those three methods fits in memory_budget bytes, as picked by selectSweepMethod,
+    and only falls back to solving each capacity with its own selectMethod choice if none of them fits.'''
+    import numpy as np
+
+    # Confirm that method argument is valid
+    valid_methods = Solver().SOLVER_METHODS
+    if method not in valid_methods:
+        raise ValueError(f"Invalid method. Valid method names: {', '.join(valid_methods.keys())}")
+
+    capacities = [int(capacity) for capacity in capacities]
+    if not capacities:
+        return ([], []) if return_values else []
+    if method == "auto":
+        method = selectSweepMethod(max(capacities), items, memory_budget)
+
+    values = np.array([item[1] for item in items], dtype=np.int64)
+    weights = np.array([item[2] for item in items], dtype=np.int64)
+    if method == "dynamicProgramming":
+        best_values = np.zeros(max(capacities) + 1, dtype=np.int64)
+        choices = [_addItemToTable(best_values, int(value), int(weight)) for value, weight in zip(values, weights)]
+        chosen = [_chosenFromTable(choices, weights.tolist(), capacity) for capacity in capacities]
+    elif method == "minWeightDynamicProgramming":
+        min_weights, choices = _minWeightTable(max(capacities), values, weights)
+        chosen = [_chosenFromMinWeightTable(min_weights, choices, values, capacity)[0] for capacity in capacities]
+    elif method == "meetInMiddle":
+        half = (len(items) + 1) // 2
+        a_values, a_weights, a_masks = _grayCodeSums(values[:half], weights[:half])
+        b_values, b_weights, b_masks = _paretoFrontier(*_grayCodeSums(values[half:], weights[half:]))
+        chosen = []
+        for capacity in capacities:
+            best_value, a_index, b_index = _matchHalves(capacity, a_values, a_weights, b_values, b_weights)
+            best_mask = int(a_masks[a_index]) | (int(b_masks[b_index]) << half) if a_index >= 0 else 0
+            chosen.append([i for i in range(len(items)) if best_mask >> i & 1])
+    else:
+        solver = Solver(memory_budget=memory_budget)
+        solver.problems = [(capacity, items) for capacity in capacities]
+        solutions = solver.getSolutions(method)
+        chosen = None
+
+    if chosen is not None:
+        solutions = [sorted(items[i][0] for i in positions) for positions in chosen]
+    if return_values:
+        return solutions, [_solutionValue(items, solution) for solution in solutions]
+    return solutions
+
+
+def selectSweepMethod(capacity, items, memory_budget=AUTO_MEMORY_BUDGET):
+    '''Return the name of the solving method best suited to solveCapacities sweeping the given items over capacities of up
+    to the given capacity, within the given memory budget in bytes: of the methods that share their work between the
+    capacities, the one that fits with the least work to do, or "auto" if none of them fits.'''
+
+    # The same memory estimates as in selectMethod; the value-indexed table likewise has one bit per item and total value
+    num_items = len(items)
+    dp_cells = num_items * (capacity + 1)
+    total_value = sum(item[1] for item in items)
+    value_cells = num_items * (total_value + 1)
+    half_subsets = 2**((num_items + 1) // 2)
+
+    # Of the methods that fit, take the one with the least work to do
+    candidates = []
+    if dp_cells // 8 + 16 * (capacity + 1) <= memory_budget:
+        candidates.append((dp_cells, "dynamicProgramming"))
+    if value_cells // 8 + 16 * (total_value + 1) <= memory_budget:
+        candidates.append((value_cells, "minWeightDynamicProgramming"))
+    if num_items <= AUTO_MEET_IN_MIDDLE_ITEMS and 64 * half_subsets <= memory_budget:
+        candidates.append((AUTO_DP_CELLS_PER_SUBSET * half_subsets, "meetInMiddle"))
+    return min(candidates)[1] if candidates else "auto"
+
+
+def selectMethod(capacity, items, memory_budget=AUTO_MEMORY_BUDGET):
+    '''Return the name of the solving method best suited to the given problem instance, within the given memory budget in bytes.'''
+
+    # Tiny instances are searched in pure Python, so that solving them doesn't pay for importing NumPy
+    num_items = len(items)
+    if num_items <= AUTO_SEARCH_ITEMS:
+        return "branchAndBound"
+
+    # Dynamic programming keeps one row of values plus one bit per item and capacity
+    dp_cells = num_items * (capacity + 1)
+    dp_memory = dp_cells // 8 + 16 * (capacity + 1)
+    if dp_cells <= AUTO_SMALL_DP_CELLS and dp_memory <= memory_budget:
+        return "dynamicProgramming"
+
+    # The value-indexed table is just as quick when the values are small, however big the capacity
+    total_value = sum(item[1] for item in items)
+    value_cells = num_items * (total_value + 1)
+    if value_cells <= AUTO_SMALL_VALUE_DP_CELLS:
+        return "minWeightDynamicProgramming"
+
+    # Branch and bound needs almost no memory, and its bound prunes well unless values track weights closely. Ranks keep
+    # a single outlying item from hiding that: it lowers the rank correlation of n items by at most 6 / (n + 1).
+    if _correlation(_ranks([item[1] for item in items]), _ranks([item[2] for item in items])) < AUTO_CORRELATION_LIMIT:
+        return "branchAndBound"
+
+    # Otherwise prefer a method whose running time doesn't depend on how well the bound prunes, if it fits, and of
+    # dynamic programming and meet in the middle, whichever has less work to do. Meet in the middle keeps values, weights
+    # and bitmasks for both halves' subsets, plus sorting and matching scratch space.
+    half_subsets = 2**((num_items + 1) // 2)
+    middle_fits = num_items <= AUTO_MEET_IN_MIDDLE_ITEMS and 64 * half_subsets <= memory_budget
+    if dp_memory <= memory_budget and not (middle_fits and AUTO_DP_CELLS_PER_SUBSET * half_subsets < dp_cells):
+        return "dynamicProgramming"
+    if middle_fits:
+        return "meetInMiddle"
+    # Schroeppel-Shamir keeps the same for all four quarters' subsets, plus a chunk of combined subsets at a time
+    if (num_items <= AUTO_SCHROEPPEL_SHAMIR_ITEMS
+            and 64 * (4 * 2**((num_items + 3) // 4) + SCHROEPPEL_SHAMIR_CHUNK_SIZE) <= memory_budget):
+        return "schroeppelShamir"
+    return "branchAndBound"
+
+
+def _correlation(xs, ys):
+    '''Return the Pearson correlation of two equally long lists of numbers, or 0.0 if either list is constant.'''
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance_x = sum((x - mean_x) ** 2 for x in xs)
+    variance_y = sum((y - mean_y) ** 2 for y in ys)
+    if variance_x == 0 or variance_y == 0:
+        return 0.0
+    return covariance / (variance_x * variance_y) ** 0.5
+
+
+def _ranks(xs):
+    '''Return the rank of each of a list of numbers, from 0 for the smallest; tied numbers share their average rank.'''
+    order = sorted(range(len(xs)), key=xs.__getitem__)
+    ranks = [0.0] * len(xs)
+    start = 0
+    while start < len(order):
+        stop = start + 1
+        while stop < len(order) and xs[order[stop]] == xs[order[start]]:
+            stop += 1
+        for i in order[start:stop]:
+            ranks[i] = (start + stop - 1) / 2
+        start = stop
+    return ranks
+
+
+def iterProblemsFromFile(filename):
+    '''Yield the problems represented in the specified text file one ProblemInstance at a time, without reading the whole file.
+
+    After the first line (the number of problems), each problem is a line with its name, a line with its capacity, and then
+    one "name value weight" line per item. A line is only an item if it ends in two integers, so item and problem names may
+    contain spaces, and blank lines are ignored. The filename "-" reads from standard input.'''
+
+    if filename == "-":
+        f = open(sys.stdin.fileno(), closefd=False)
+    else:
+        try:
+            f = open(filename)
+        except FileNotFoundError:
+            f = open('problems/' + filename)
+
+    with f:
+        # Skip the first line
+        next(f, None)
+
+        instance = None
+        expecting_capacity = False
+        for line in f:
+            line_values = line.rsplit(None, 2)
+            if not line_values:
+                continue
+
+            # The line right after a problem name holds its capacity
+            if expecting_capacity:
+                instance.capacity = int(line_values[0])
+                expecting_capacity = False
+                continue
+
+            # Check if the line is an item of the current problem
+            if instance is not None and len(line_values) == 3:
+                try:
+                    instance.addItem(line_values[0], int(line_values[1]), int(line_values[2]))
+                    continue
+                except ValueError:
+                    pass
+
+            # Otherwise it's the name of a new problem; the previous one is complete
+            if instance is not None:
+                yield instance
+            instance = ProblemInstance(line.strip(), None)
+            expecting_capacity = True
+
+        if instance is not None:
+            yield instance
+
+
+def solve_stream(filename, method="auto", verbosity=0, search_workers=1):
+    '''Yield the solution of each problem in a file as soon as it is solved, reading the file one problem at a time.
+
+    search_workers is passed on to the Solver of each problem, as in Solver(search_workers).'''
+
+    # Confirm that method argument is valid before reading anything
+    valid_methods = Solver().SOLVER_METHODS
+    if method not in valid_methods:
+        raise ValueError(f"Invalid method. Valid method names: {', '.join(valid_methods.keys())}")
+
+    for instance in iterProblemsFromFile(filename):
+        solution, stats = _solveProblem(method, instance.capacity, instance.names, instance.values, instance.weights,
+                                        search_workers=search_workers)
+        if verbosity == 1:
+            print(f"Solved {instance.name} ({'%.3f' % stats.elapsed} sec)")
+        yield solution
+
+
+def _solveProblem(method, capacity, names, values, weights, time_limit=None, node_limit=None, epsilon=FPTAS_EPSILON,
+                  search_workers=1, memory_budget=AUTO_MEMORY_BUDGET, warm_start=None):
+    '''Solve a single problem instance in a worker process; return its sorted solution and its SolverStats.
+
+    search_workers and memory_budget are the Solver settings to solve it with, and warm_start its warm start, if any.'''
+    solver = Solver(search_workers, memory_budget)
+    if warm_start is not None:
+        solver.warm_starts[0] = warm_start
+    solver.time_limit = time_limit
+    solver.node_limit = node_limit
+    solver.epsilon = epsilon
+    solver.problems = [(capacity, list(zip(names, values, weights)))]
+    stats = solver.stats = [SolverStats(method)]
+    start = time.perf_counter()
+    solution = solver.SOLVER_METHODS[method](0)
+    end = time.perf_counter()
+    stats[0].elapsed = end - start
+    return sorted(solution), stats[0]
+
+
+def _solutionValue(items, solution):
+    '''Return the total value of the items with the given names; each name counts once per time it appears in the solution.'''
+    remaining = dict()
+    for name in solution:
+        remaining[name] = remaining.get(name, 0) + 1
+    total = 0
+    for name, value, weight in items:
+        if remaining.get(name, 0):
+            remaining[name] -= 1
+            total += value
+    return total
+
+
+def _greedyAndBound(capacity, items):
+    '''Return (greedy_value, greedy_mask, upper_bound) for the given items.
+
+    The greedy solution adds each item, in order of decreasing value/weight ratio, if it still fits; greedy_mask has bit i
+    set if item i is in it. upper_bound is the rounded-down Dantzig (fractional knapsack) bound on the optimal value.'''
+
+    order = sorted(range(len(items)), reverse=True,
+                   key=lambda i: items[i][1] / items[i][2] if items[i][2] else float('inf'))
+    greedy_value = greedy_weight = greedy_mask = 0
+    upper_bound = None
+    for i in order:
+        name, value, weight = items[i]
+        if upper_bound is None and greedy_weight + weight > capacity:
+            # The first item that doesn't fit is the critical item, of which the bound takes a fraction
+            upper_bound = greedy_value + (capacity - greedy_weight) * value // weight
+        if greedy_weight + weight <= capacity:
+            greedy_weight += weight
+            greedy_value += value
+            greedy_mask |= 1 << i
+    if upper_bound is None:
+        upper_bound = greedy_value
+    return greedy_value, greedy_mask, upper_bound
+
+
+def _nextBudgetCheck(nodes_expanded, node_limit):
+    '''Return the node count at which a search should next check its budget.'''
+    if node_limit is None:
+        return nodes_expanded + BUDGET_CHECK_INTERVAL
+    return min(node_limit, nodes_expanded + BUDGET_CHECK_INTERVAL)
+
+
+def _budgetExhausted(nodes_expanded, deadline, node_limit):
+    return (node_limit is not None and nodes_expanded >= node_limit) or (deadline is not None and time.perf_counter() >= deadline)
+
+
+def _grayCodeSums(values, weights):
+    '''Return the (values, weights, masks) arrays of every subset of the given items, in Gray-code order.'''
+    import numpy as np
+
+    # Step i of a Gray code flips the bit at the position of the lowest set bit of i
+    steps = np.arange(1, 2**len(values), dtype=np.int64)
+    masks = np.concatenate(([0], steps ^ (steps >> 1)))
+    flipped = np.log2(steps & -steps).astype(np.int64)
+
+    # The flipped item is added if its bit is now set, and removed otherwise
+    signs = np.where((masks[1:] >> flipped) & 1, 1, -1)
+    subset_values = np.concatenate(([0], np.cumsum(signs * values[flipped])))
+    subset_weights = np.concatenate(([0], np.cumsum(signs * weights[flipped])))
+    return subset_values, subset_weights, masks
+
+
+def _bruteForceRange(capacity, values, weights, chunk_bits, start, stop, deadline=None, node_limit=None):
+    '''Exhaustively search the subsets whose items outside the low chunk_bits items are given by the Gray codes of start to stop - 1.
+
+    The search stops early at the perf_counter() deadline, or after node_limit combinations of the items outside the chunk.
+    Return (best_value, best_mask, num_searched, num_pruned), where best_mask has bit i set if item i is chosen, num_searched
+    is the number of combinations of the items outside the chunk that were reached, and num_pruned is how many of those
+    were skipped for being over capacity on their own.'''
+    import numpy as np
+
+    # Every subset of the chunk, checked all together against each combination of the other items
+    chunk_values, chunk_weights, chunk_masks = _grayCodeSums(values[:chunk_bits], weights[:chunk_bits])
+    outer_values = values[chunk_bits:]
+    outer_weights = weights[chunk_bits:]
+
+    # Sum the items chosen by the first Gray code in the range; every later step only changes a single item
+    gray = start ^ (start >> 1)
+    outer_value = sum(int(outer_values[j]) for j in range(len(outer_values)) if gray >> j & 1)
+    outer_weight = sum(int(outer_weights[j]) for j in range(len(outer_weights)) if gray >> j & 1)
+
+    # Variables to track the highest value so far and the corresponding bitmask
+    best_value = -1
+    best_mask = 0
+    num_pruned = 0
+
+    for i in range(start, stop):
+
+        # Stop early if the budget has run out
+        if (node_limit is not None and i - start >= node_limit) or (deadline is not None and time.perf_counter() >= deadline):
+            return best_value, best_mask, i - start, num_pruned
+
+        # Move to the next Gray code by flipping the bit at the position of the lowest set bit of i
+        if i != start:
+            j = (i & -i).bit_length() - 1
+            gray ^= 1 << j
+            if gray >> j & 1:
+                outer_value += int(outer_values[j])
+                outer_weight += int(outer_weights[j])
+            else:
+                outer_value -= int(outer_values[j])
+                outer_weight -= int(outer_weights[j])
+
+        # Skip this combination entirely if it is already over capacity
+        remaining = capacity - outer_weight
+        if remaining < 0:
+            num_pruned += 1
+            continue
+
+        # Find the most valuable subset of the chunk that fits alongside this combination
+        chunk_fitting_values = np.where(chunk_weights <= remaining, chunk_values, -1)
+        k = int(np.argmax(chunk_fitting_values))
+
+        # If this is the best legal value so far, update variables accordingly
+        if outer_value + chunk_fitting_values[k] > best_value:
+            best_value = outer_value + int(chunk_fitting_values[k])
+            best_mask = (gray << chunk_bits) | int(chunk_masks[k])
+
+    return best_value, best_mask, stop - start, num_pruned
+
+
+def _paretoFrontier(values, weights, masks):
+    '''Return the (values, weights, masks) of the given subsets that no lighter or equally heavy subset beats, sorted by weight.
+
+    Along the returned arrays, both weight and value strictly increase.'''
+    import numpy as np
+
+    # Sort by increasing weight, breaking ties by decreasing value
+    order = np.lexsort((-values, weights))
+    values, weights, masks = values[order], weights[order], masks[order]
+
+    # Keep only the subsets that are worth more than every subset before them
+    previous_best = np.concatenate(([-1], np.maximum.accumulate(values)[:-1]))
+    keep = values > previous_best
+    return values[keep], weights[keep], masks[keep]
+
+
+def _matchHalves(capacity, a_values, a_weights, frontier_values, frontier_weights):
+    '''Pair each first-half subset with the most valuable frontier subset that fits alongside it.
+
+    Return (best_value, a_index, frontier_index) for the best pair, or (-1, -1, -1) if no first-half subset fits.
+    The frontier must include the empty subset.'''
+    import numpy as np
+
+    # Only the first-half subsets that fit on their own can be part of a solution
+    fitting = np.flatnonzero(a_weights <= capacity)
+    if len(fitting) == 0:
+        return -1, -1, -1
+
+    # Since frontier values increase with weight, the heaviest frontier subset that fits is also the most valuable one
+    matches = np.searchsorted(frontier_weights, capacity - a_weights[fitting], side='right') - 1
+    totals = a_values[fitting] + frontier_values[matches]
+    best = int(np.argmax(totals))
+    return int(totals[best]), int(fitting[best]), int(matches[best])
+
+
+def _matchHalvesInParallel(capacity, a_values, a_weights, frontier_values, frontier_weights, workers):
+    '''Split _matchHalves across worker processes, each taking a contiguous shard of the first half's subsets.
+
+    The subset arrays are copied once into a shared memory block that the workers read from, rather than being pickled per worker.'''
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    num_a = len(a_values)
+    num_frontier = len(frontier_values)
+    block = shared_memory.SharedMemory(create=True, size=8 * 2 * (num_a + num_frontier))
+    try:
+        # Lay the arrays out one after another in the block: a_values, a_weights, frontier_values, frontier_weights
+        shared = np.ndarray(2 * (num_a + num_frontier), dtype=np.int64, buffer=block.buf)
+        shared[:num_a] = a_values
+        shared[num_a:2 * num_a] = a_weights
+        shared[2 * num_a:2 * num_a + num_frontier] = frontier_values
+        shared[2 * num_a + num_frontier:] = frontier_weights
+        del shared
+
+        num_shards = min(workers, num_a)
+        bounds = [num_a * k // num_shards for k in range(num_shards + 1)]
+        with ProcessPoolExecutor(max_workers=num_shards) as executor:
+            shard_results = list(executor.map(_matchHalvesShard, *zip(*[
+                (block.name, num_a, num_frontier, capacity, bounds[k], bounds[k + 1]) for k in range(num_shards)])))
+    finally:
+        block.close()
+        block.unlink()
+
+    # Shards are reduced in order, keeping the first best one, so the result matches a single-process search
+    best = (-1, -1, -1)
+    for shard_result in shard_results:
+        if shard_result[0] > best[0]:
+            best = shard_result
+    return best
+
+
+def _matchHalvesShard(block_name, num_a, num_frontier, capacity, start, stop):
+    '''Run _matchHalves on the first-half subsets start to stop - 1, reading the subset arrays from a shared memory block.'''
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        shared = np.ndarray(2 * (num_a + num_frontier), dtype=np.int64, buffer=block.buf)
+        best_value, a_index, frontier_index = _matchHalves(capacity, shared[start:stop], shared[num_a + start:num_a + stop],
+                                                           shared[2 * num_a:2 * num_a + num_frontier],
+                                                           shared[2 * num_a + num_frontier:])
+        del shared
+    finally:
+        block.close()
+    if a_index < 0:
+        return best_value, a_index, frontier_index
+    return best_value, start + a_index, frontier_index
+
+
+def _pairSumsByWeight(first, second, shift, chunk_size):
+    '''Yield the (values, weights, masks) of every combination of a subset from first with a subset from second, in
+    increasing order of weight, in chunks of about chunk_size combinations.
+
+    first and second are (values, weights, masks) arrays sorted by weight, and the masks of second are shifted left by
+    shift bits when combined. Only the current chunk and one position per subset of first are held in memory.'''
+    import numpy as np
+
+    first_values, first_weights, first_masks = first
+    second_values, second_weights, second_masks = second
+
+    # consumed[i] is the number of subsets of second already combined with subset i of first
+    consumed = np.zeros(len(first_weights), dtype=np.int64)
+    remaining = len(first_weights) * len(second_weights)
+    lowest = int(first_weights[0] + second_weights[0]) if remaining else 0
+    heaviest = int(first_weights[-1] + second_weights[-1]) if remaining else 0
+
+    while remaining > 0:
+
+        # Binary search for the lowest weight threshold that lets at least chunk_size new combinations through
+        if remaining <= chunk_size:
+            threshold = heaviest
+        else:
+            low, high = lowest, heaviest
+            while low < high:
+                middle = (low + high) // 2
+                if int((np.searchsorted(second_weights, middle - first_weights, side='right') - consumed).sum()) >= chunk_size:
+                    high = middle
+                else:
+                    low = middle + 1
+            threshold = low
+
+        # Gather the combinations at or below the threshold that haven't been yielded yet, row by row
+        ends = np.searchsorted(second_weights, threshold - first_weights, side='right')
+        counts = ends - consumed
+        rows = np.repeat(np.arange(len(first_weights)), counts)
+        columns = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts - consumed, counts)
+        chunk_weights = first_weights[rows] + second_weights[columns]
+        order = np.argsort(chunk_weights, kind='stable')
+        rows, columns = rows[order], columns[order]
+        yield (first_values[rows] + second_values[columns], chunk_weights[order],
+               first_masks[rows] | (second_masks[columns] << shift))
+
+        consumed = ends
+        remaining -= len(rows)
+        lowest = threshold + 1
+
+
+def _matchWeightStreams(capacity, a_chunks, b_chunks):
+    '''Pair each subset from a_chunks, which come in decreasing order of weight, with the most valuable subset from b_chunks,
+    which come in increasing order of weight, that fits alongside it.
+
+    Return (best_value, a_mask, b_mask) for the best pair, or (-1, 0, 0) if nothing fits.
+    Both streams must include the empty subset.'''
+    import numpy as np
+
+    best = (-1, 0, 0)
+
+    # The most valuable second-stream subset that fits alongside every first-stream subset seen so far
+    fitting_value, fitting_mask = -1, 0
+
+    # Second-stream subsets that have been read, but are too heavy for the first-stream subsets seen so far
+    pending = []
+    exhausted = False
+
+    for a_values, a_weights, a_masks in a_chunks:
+
+        # Only the first-stream subsets that fit on their own can be part of a solution
+        fits = a_weights <= capacity
+        if not fits.any():
+            continue
+        a_values, a_weights, a_masks = a_values[fits], a_weights[fits], a_masks[fits]
+
+        # Read second-stream subsets until they are too heavy for even the lightest subset in this chunk
+        room = capacity - a_weights
+        while not exhausted and (not pending or pending[-1][1][-1] <= room[-1]):
+            try:
+                pending.append(next(b_chunks))
+            except StopIteration:
+                exhausted = True
+        if not pending:
+            # Every second-stream subset has been read and fits, so the best of them fits alongside this whole chunk
+            k = int(np.argmax(a_values))
+            if a_values[k] + fitting_value > best[0]:
+                best = (int(a_values[k]) + fitting_value, int(a_masks[k]), fitting_mask)
+            continue
+        b_values = np.concatenate([chunk[0] for chunk in pending])
+        b_weights = np.concatenate([chunk[1] for chunk in pending])
+        b_masks = np.concatenate([chunk[2] for chunk in pending])
+
+        # The best partner for each subset is either an earlier fitting subset, or the best one read since that fits
+        running_best = np.maximum.accumulate(b_values)
+        matches = np.searchsorted(b_weights, room, side='right') - 1
+        partner_values = np.maximum(np.where(matches >= 0, running_best[np.maximum(matches, 0)], -1), fitting_value)
+        totals = a_values + partner_values
+        k = int(np.argmax(totals))
+        if totals[k] > best[0]:
+            if partner_values[k] > fitting_value:
+                b_mask = int(b_masks[int(np.argmax(b_values[:matches[k] + 1]))])
+            else:
+                b_mask = fitting_mask
+            best = (int(totals[k]), int(a_masks[k]), b_mask)
+
+        # Every subset light enough for this chunk's lightest subset fits alongside all later ones, so only its best is kept
+        cut = int(np.searchsorted(b_weights, room[-1], side='right'))
+        if cut > 0:
+            j = int(np.argmax(b_values[:cut]))
+            if b_values[j] > fitting_value:
+                fitting_value, fitting_mask = int(b_values[j]), int(b_masks[j])
+        pending = [(b_values[cut:], b_weights[cut:], b_masks[cut:])] if cut < len(b_values) else []
+
+    return best
+
+
+def _addItemToTable(best_values, value, weight):
+    '''Update a capacity-indexed dynamic programming row in place with one more item; return the item's packed choice bits.'''
+    import numpy as np
+
+    capacity = len(best_values) - 1
+
+    # An item heavier than the knapsack can never be taken
+    if weight > capacity:
+        return np.zeros((capacity + 8) // 8, dtype=np.uint8)
+
+    # Compare not taking the item against taking it on top of the best packing of the remaining capacity
+    with_item = best_values[:capacity + 1 - weight] + value
+    taken = with_item > best_values[weight:]
+    np.maximum(best_values[weight:], with_item, out=best_values[weight:])
+    return np.packbits(np.concatenate((np.zeros(weight, dtype=bool), taken)))
+
+
+def _chosenFromTable(choices, weights, capacity):
+    '''Walk back through the packed choice rows of a capacity-indexed table; return the positions of the items chosen at capacity.
+
+    capacity may be below the capacity that the table was built for, since each column only depends on the ones before it.'''
+
+    chosen = []
+    remaining = capacity
+    for i in range(len(weights) - 1, -1, -1):
+        if (choices[i][remaining >> 3] >> (7 - (remaining & 7))) & 1:
+            chosen.append(i)
+            remaining -= weights[i]
+    return chosen[::-1]
+
+
+def _minWeightChoices(capacity, values, weights, stats):
+    '''Run value-indexed dynamic programming on the given items; return the positions of the chosen items and their total value.
+
+    Phase times are added to the given SolverStats.'''
+    with stats.timePhase("table"):
+        min_weights, choices = _minWeightTable(capacity, values, weights)
+    with stats.timePhase("reconstruction"):
+        return _chosenFromMinWeightTable(min_weights, choices, values, capacity)
+
+
+def _minWeightTable(capacity, values, weights):
+    '''Return the (min_weights, choices) of value-indexed dynamic programming on the given items.
+
+    min_weights[v] is the lowest weight of any subset worth exactly v, or capacity + 1 if none fits, and row i of choices
+    holds one packed bit per value v, set if item i was taken when computing min_weights[v].'''
+    import numpy as np
+
+    num_items = len(values)
+    total_value = int(values[(weights <= capacity) & (values > 0)].sum())
+    min_weights = np.full(total_value + 1, capacity + 1, dtype=np.int64)
+    min_weights[0] = 0
+    choices = np.zeros((num_items, (total_value + 8) // 8), dtype=np.uint8)
+
+    highest = 0
+    for i in range(num_items):
+        value = int(values[i])
+        weight = int(weights[i])
+
+        # Items that are too heavy or worthless can never improve a solution
+        if weight > capacity or value == 0:
+            continue
+
+        # Compare not taking the item against taking it on top of the lightest subset worth the remaining value;
+        # only the values up to the highest one reachable so far, plus this item's, can change
+        with_item = min_weights[:highest + 1] + weight
+        taken = with_item < min_weights[value:highest + value + 1]
+        np.minimum(min_weights[value:highest + value + 1], with_item, out=min_weights[value:highest + value + 1])
+        row = np.packbits(np.concatenate((np.zeros(value, dtype=bool), taken)))
+        choices[i, :len(row)] = row
+        highest += value
+    return min_weights, choices
+
+
+def _chosenFromMinWeightTable(min_weights, choices, values, capacity):
+    '''Walk back through the choice rows from the highest value that fits in capacity; return the positions of the items
+    that produced it, and that value.
+
+    capacity may be below the capacity that the table was built for, since the lightest subset for each value stays the same.'''
+    import numpy as np
+
+    best_value = int(np.flatnonzero(min_weights <= capacity)[-1])
+    chosen = []
+    remaining = best_value
+    for i in range(len(values) - 1, -1, -1):
+        if (choices[i, remaining >> 3] >> (7 - (remaining & 7))) & 1:
+            chosen.append(i)
+            remaining -= int(values[i])
+    return chosen[::-1], best_value
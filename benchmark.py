@@ -0,0 +1,228 @@
+from backpack import Solver
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import re
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Fields written for every (method, file) pair, in CSV column order
+RECORD_FIELDS = ["method", "file", "size", "status", "repeats", "wall_median", "wall_min", "cpu_median",
+                 "peak_traced_bytes", "peak_rss_bytes", "nodes_expanded", "nodes_pruned"]
+
+
+def problemFiles(directory="problems"):
+    '''Return the problems_size*.txt files in the given directory, from smallest to largest problem size.'''
+    filenames = [filename for filename in glob.glob(os.path.join(directory, "problems_size*.txt"))
+                 if not filename.endswith("_solutions.txt")]
+    return sorted(filenames, key=problemSize)
+
+
+def problemSize(filename):
+    '''Return the approximate problem size in the name of a problems_size*.txt file.'''
+    return int(re.search(r"problems_size(\d+)", filename).group(1))
+
+
+def _solveInChild(filename, method, measure_memory, connection):
+    '''Solve a whole file in this (child) process and send back its timings, or the error that stopped it.'''
+    try:
+        solver = Solver()
+        solver.loadProblemFromFile(filename)
+
+        # The solving methods import NumPy when they first need it; that one-off cost shouldn't count towards their timings
+        import numpy
+        if measure_memory:
+            tracemalloc.start()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        solutions, stats = solver.getSolutions(method, return_stats=True)
+        result = {"wall": time.perf_counter() - wall_start, "cpu": time.process_time() - cpu_start,
+                  "nodes_expanded": sum(instance_stats.nodes_expanded for instance_stats in stats),
+                  "nodes_pruned": sum(instance_stats.nodes_pruned for instance_stats in stats)}
+        if measure_memory:
+            result["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        # ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result["peak_rss_bytes"] = peak_rss if sys.platform == "darwin" else peak_rss * 1024
+        connection.send(("ok", result))
+    except Exception as error:
+        connection.send(("error", repr(error)))
+    finally:
+        connection.close()
+
+
+def runOnce(filename, method, timeout, measure_memory=False):
+    '''Solve a whole file with the given method in a fresh process, killing it after timeout seconds.
+
+    Return a (status, result) tuple, where status is "ok", "timeout", "error" or "crashed".'''
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_solveInChild, args=(filename, method, measure_memory, sender))
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            return "timeout", None
+        return receiver.recv()
+    except EOFError:
+        # The child died without reporting anything, e.g. because it ran out of memory
+        return "crashed", None
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        receiver.close()
+
+
+def benchmarkMethod(filename, method, timeout, repeats):
+    '''Time a method on a whole file repeats times, then measure its memory use in one more run; return a record dict.'''
+
+    record = dict.fromkeys(RECORD_FIELDS)
+    record.update(method=method, file=os.path.basename(filename), size=problemSize(filename), repeats=0)
+
+    walls = []
+    cpus = []
+    for i in range(repeats):
+        status, result = runOnce(filename, method, timeout)
+        record["status"] = status
+        if status != "ok":
+            return record
+        walls.append(result["wall"])
+        cpus.append(result["cpu"])
+        record["peak_rss_bytes"] = result["peak_rss_bytes"]
+        record["nodes_expanded"] = result["nodes_expanded"]
+        record["nodes_pruned"] = result["nodes_pruned"]
+
+    # Tracing allocations slows the solvers down, so memory is measured separately from the timed runs
+    status, result = runOnce(filename, method, timeout, measure_memory=True)
+    if status == "ok":
+        record["peak_traced_bytes"] = result["peak_traced_bytes"]
+    record.update(repeats=repeats, wall_median=statistics.median(walls), wall_min=min(walls),
+                  cpu_median=statistics.median(cpus))
+    return record
+
+
+def runBenchmarks(methods=None, filenames=None, timeout=10.0, repeats=3, verbosity=1):
+    '''Benchmark every method on every file; return the list of record dicts.
+
+    Once a method fails on a file (by timing out, for instance), it is skipped for all the larger files.'''
+
+    if methods is None:
+        methods = list(Solver().SOLVER_METHODS)
+    if filenames is None:
+        filenames = problemFiles()
+
+    records = []
+    for method in methods:
+        failed = False
+        for filename in sorted(filenames, key=problemSize):
+            if failed:
+                record = dict.fromkeys(RECORD_FIELDS)
+                record.update(method=method, file=os.path.basename(filename), size=problemSize(filename),
+                              status="skipped", repeats=0)
+            else:
+                record = benchmarkMethod(filename, method, timeout, repeats)
+                failed = record["status"] != "ok"
+            records.append(record)
+            if verbosity == 1:
+                timing = f"{'%.4f' % record['wall_median']} sec" if record["status"] == "ok" else record["status"]
+                print(f"{method} on {record['file']}: {timing}")
+    return records
+
+
+def compareToBaseline(records, baseline_records, tolerance=0.25, min_difference=0.01):
+    '''Return a list of messages describing every regression from the baseline records.
+
+    A regression is a method that no longer finishes a file that it used to, or whose median wall time grew
+    by more than the tolerance (as a fraction of the baseline time) and by more than min_difference seconds.'''
+
+    baseline = {(record["method"], record["file"]): record for record in baseline_records}
+    regressions = []
+    for record in records:
+        old = baseline.get((record["method"], record["file"]))
+        if old is None or old["status"] != "ok":
+            continue
+        if record["status"] != "ok":
+            regressions.append(f"{record['method']} on {record['file']}: {record['status']} (baseline {'%.4f' % old['wall_median']} sec)")
+        elif (record["wall_median"] > old["wall_median"] * (1 + tolerance)
+                and record["wall_median"] - old["wall_median"] > min_difference):
+            regressions.append(f"{record['method']} on {record['file']}: {'%.4f' % record['wall_median']} sec "
+                               f"(baseline {'%.4f' % old['wall_median']} sec)")
+    return regressions
+
+
+def saveRecords(records, json_filename=None, csv_filename=None):
+    if json_filename is not None:
+        with open(json_filename, "w") as f:
+            json.dump({"python": sys.version.split()[0], "platform": sys.platform, "records": records}, f, indent=1)
+    if csv_filename is not None:
+        with open(csv_filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(records)
+
+
+def savePlot(records, filename):
+    '''Save a plot of median wall time against problem size for every method that finished at least two files.'''
+
+    # Only the plot needs matplotlib, and it shouldn't try to open a window
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    for method in dict.fromkeys(record["method"] for record in records):
+        finished = [record for record in records if record["method"] == method and record["status"] == "ok"]
+        if len(finished) >= 2:
+            plt.plot([record["size"] for record in finished], [record["wall_median"] for record in finished],
+                     marker="o", label=method)
+    plt.title("Median Time to Solve Each File")
+    plt.xlabel("Approximate Problem Size")
+    plt.ylabel("Running Time (sec)")
+    plt.xscale("log")
+    plt.yscale("log")
+    plt.legend()
+    plt.savefig(filename)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Knapsack solving methods on the problems/ files.")
+    parser.add_argument("--methods", nargs="+", help="methods to benchmark (default: every registered method)")
+    parser.add_argument("--files", nargs="+", help="problem files to solve (default: every problems/problems_size*.txt)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds allowed per method per file (default: 10)")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per method per file (default: 3)")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("--csv", help="write the results to this CSV file")
+    parser.add_argument("--plot", help="save a plot of the results to this image file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file, and fail on any regression")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed fractional slowdown from the baseline (default: 0.25)")
+    parser.add_argument("--min-difference", type=float, default=0.01,
+                        help="slowdowns of fewer seconds than this are never regressions (default: 0.01)")
+    args = parser.parse_args(argv)
+
+    records = runBenchmarks(args.methods, args.files, args.timeout, args.repeats)
+    saveRecords(records, args.json, args.csv)
+    if args.plot:
+        savePlot(records, args.plot)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_records = json.load(f)["records"]
+        regressions = compareToBaseline(records, baseline_records, args.tolerance, args.min_difference)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+        print("No regressions from the baseline.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+from Stack import Stack
+from LinkedList import LinkedList
+import timeit
+
+
+class LinkedListStack:
+    '''The previous LinkedList-backed Stack, kept here as the reference point for the benchmark.'''
+
+    class TopElementError(Exception):
+        def __init__(self):
+            super().__init__("Stack is empty")
+
+    def __init__(self):
+        self.__items = LinkedList()
+
+    def is_empty(self):
+        return self.__items.size() == 0
+
+    def push(self, element):
+        self.__items.add(element)
+
+    def pop(self):
+        if self.is_empty():
+            raise self.TopElementError()
+        element = self.__items[-1]
+        del self.__items[-1]
+        return element
+
+
+def pushPopCycle(stack_class, depth):
+    '''Push depth elements onto a new stack, then pop them all off, like a search loop draining its stack.'''
+    stack = stack_class()
+    for i in range(depth):
+        stack.push(i)
+    while not stack.is_empty():
+        stack.pop()
+
+
+def main(depth=1000, repeats=5, number=200):
+
+    # Report the best per-operation cost (one push plus one pop) for each implementation
+    results = dict()
+    for stack_class in (LinkedListStack, Stack):
+        best = min(timeit.repeat(lambda: pushPopCycle(stack_class, depth), repeat=repeats, number=number))
+        results[stack_class.__name__] = best / (number * depth)
+        print(f"{stack_class.__name__}: {'%.1f' % (results[stack_class.__name__] * 1e9)} ns per push/pop pair")
+    print(f"Speedup: {'%.2f' % (results['LinkedListStack'] / results['Stack'])}x")
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+from backpack import ProblemInstance, iterProblemsFromFile
+import numpy as np
+
+# A binary problem file is an 8-byte magic string, then a header of four int64 counts
+#   num_problems, num_items, problem_names_size, item_names_size
+# and then these int64 sections, in order:
+#   capacities[num_problems], item_offsets[num_problems + 1], values[num_items], weights[num_items],
+#   problem_name_offsets[num_problems + 1], item_name_offsets[num_items + 1]
+# followed by the UTF-8 string tables of the problem names and the item names that the name offsets point into.
+# The items of problem p are at indices item_offsets[p] to item_offsets[p + 1] - 1 of the item sections.
+MAGIC = b"KNAPBIN1"
+HEADER_SIZE = len(MAGIC) + 4 * 8
+
+
+def _sectionSizes(num_problems, num_items, problem_names_size, item_names_size):
+    return [8 * num_problems, 8 * (num_problems + 1), 8 * num_items, 8 * num_items,
+            8 * (num_problems + 1), 8 * (num_items + 1), problem_names_size, item_names_size]
+
+
+def convertTextToBinary(text_filename, binary_filename):
+    '''Convert a text problem file into the binary format, reading the text file one problem at a time.'''
+
+    # First pass: count the problems, items and name bytes, so that every section's position is known up front
+    counts = [0, 0, 0, 0]
+    for instance in iterProblemsFromFile(text_filename):
+        counts[0] += 1
+        counts[1] += len(instance.names)
+        counts[2] += len(instance.name.encode())
+        counts[3] += sum(len(name.encode()) for name in instance.names)
+
+    # Second pass: write each problem's part of every section at that section's running position
+    with open(binary_filename, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.array(counts, dtype=np.int64).tobytes())
+
+        cursors = [HEADER_SIZE]
+        for size in _sectionSizes(*counts)[:-1]:
+            cursors.append(cursors[-1] + size)
+
+        def writeSection(section, data):
+            f.seek(cursors[section])
+            f.write(data)
+            cursors[section] += len(data)
+
+        # Every offsets section starts at 0
+        for section in (1, 4, 5):
+            writeSection(section, np.zeros(1, dtype=np.int64).tobytes())
+
+        item_offset = problem_name_offset = item_name_offset = 0
+        for instance in iterProblemsFromFile(text_filename):
+            problem_name = instance.name.encode()
+            item_names = [name.encode() for name in instance.names]
+            item_offset += len(item_names)
+            problem_name_offset += len(problem_name)
+            item_name_offsets = item_name_offset + np.cumsum([len(name) for name in item_names], dtype=np.int64)
+            item_name_offset += sum(len(name) for name in item_names)
+
+            writeSection(0, np.array([instance.capacity], dtype=np.int64).tobytes())
+            writeSection(1, np.array([item_offset], dtype=np.int64).tobytes())
+            writeSection(2, np.asarray(instance.values, dtype=np.int64).tobytes())
+            writeSection(3, np.asarray(instance.weights, dtype=np.int64).tobytes())
+            writeSection(4, np.array([problem_name_offset], dtype=np.int64).tobytes())
+            writeSection(5, item_name_offsets.tobytes())
+            writeSection(6, problem_name)
+            writeSection(7, b"".join(item_names))
+
+
+class BinaryProblemFile:
+    '''A memory-mapped binary problem file, whose problems can be read by index without touching the rest of the file.
+
+    The values and weights of the returned ProblemInstances are zero-copy numpy views into the mapped file.'''
+
+    def __init__(self, filename):
+        self.__data = np.memmap(filename, dtype=np.uint8, mode="r")
+        if bytes(self.__data[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{filename} is not a binary problem file")
+        counts = [int(count) for count in self.__data[len(MAGIC):HEADER_SIZE].view(np.int64)]
+
+        # Map each section onto its slice of the file
+        sections = []
+        position = HEADER_SIZE
+        for size in _sectionSizes(*counts):
+            sections.append(self.__data[position:position + size])
+            position += size
+        (self.capacities, self.__item_offsets, self.__values, self.__weights,
+         self.__problem_name_offsets, self.__item_name_offsets) = [section.view(np.int64) for section in sections[:6]]
+        self.__problem_names, self.__item_names = sections[6:]
+
+    def __len__(self):
+        return len(self.capacities)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("BinaryProblemFile index out of range")
+
+        # Decode only this problem's names
+        first_item, end_item = self.__item_offsets[index], self.__item_offsets[index + 1]
+        name_offsets = self.__item_name_offsets[first_item:end_item + 1]
+        item_names = bytes(self.__item_names[name_offsets[0]:name_offsets[-1]])
+        name_offsets = (name_offsets - name_offsets[0]).tolist()
+        problem_name = bytes(self.__problem_names[self.__problem_name_offsets[index]:self.__problem_name_offsets[index + 1]])
+
+        instance = ProblemInstance(problem_name.decode(), int(self.capacities[index]))
+        instance.names = [item_names[name_offsets[i]:name_offsets[i + 1]].decode() for i in range(len(name_offsets) - 1)]
+        instance.values = self.__values[first_item:end_item]
+        instance.weights = self.__weights[first_item:end_item]
+        return instance
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
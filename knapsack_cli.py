@@ -0,0 +1,95 @@
+from backpack import Solver, FPTAS_EPSILON, iterProblemsFromFile, _solveProblem
+import argparse
+import json
+import os
+import sys
+
+
+def solveInstances(instances, method="auto", workers=None, time_limit=None, node_limit=None, epsilon=FPTAS_EPSILON,
+                   search_workers=1):
+    '''Solve each ProblemInstance from an iterable; yield (index, instance, solution, stats) tuples as the instances are solved.
+
+    If workers is more than 1, the instances are solved by that many worker processes, and are yielded in the order they
+    finish; only a few instances per worker are read ahead, so instances can be streamed from a file of any size.
+    Each instance's bruteForce or meetInMiddle search is split across search_workers processes of its own.'''
+
+    if workers is None or workers <= 1:
+        for i, instance in enumerate(instances):
+            solution, stats = _solveProblem(method, instance.capacity, instance.names, instance.values, instance.weights,
+                                            time_limit, node_limit, epsilon, search_workers)
+            yield i, instance, solution, stats
+        return
+
+    # Only a parallel run needs a process pool
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = dict()
+        for i, instance in enumerate(instances):
+            future = executor.submit(_solveProblem, method, instance.capacity, instance.names, instance.values,
+                                     instance.weights, time_limit, node_limit, epsilon, search_workers)
+            pending[future] = (i, instance)
+
+            # Keep a couple of instances per worker queued up, and hand back whatever has finished in the meantime
+            if len(pending) >= 2 * workers:
+                done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield (*pending.pop(future), *future.result())
+        for future in list(pending):
+            yield (*pending.pop(future), *future.result())
+
+
+def solutionRecord(index, instance, solution, stats):
+    '''Return the dict written out for one solved instance.'''
+
+    # The value and bound are filled in here, as getSolutions would, since instances are solved one at a time
+    items = dict(zip(instance.names, instance.values))
+    value = sum(items[name] for name in solution)
+    upper_bound = value if stats.upper_bound is None else stats.upper_bound
+    return {"index": index, "name": instance.name, "method": stats.method, "value": value, "solution": solution,
+            "optimal": upper_bound == value, "upper_bound": upper_bound, "elapsed": round(stats.elapsed, 6)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m knapsack_cli",
+                                     description="Solve the Knapsack problems in a file, writing out each solution as soon as it is found.")
+    parser.add_argument("filename", help='problem file to solve, or "-" to read it from standard input')
+    parser.add_argument("-m", "--method", default="auto", choices=list(Solver().SOLVER_METHODS),
+                        help="solving method (default: auto)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument("--search-workers", type=int, default=1,
+                        help="number of processes that each bruteForce or meetInMiddle search is split across (default: 1)")
+    parser.add_argument("-f", "--format", default="jsonl", choices=["jsonl", "text", "json"],
+                        help="jsonl: one JSON object per instance, as each is solved; text: one solution per line, as each "
+                             "is solved; json: a single list of every solution, in file order, once all are solved (default: jsonl)")
+    parser.add_argument("--time-limit", type=float, help="seconds that a search method may spend on each instance")
+    parser.add_argument("--node-limit", type=int, help="knapsack situations that a search method may expand per instance")
+    parser.add_argument("--epsilon", type=float, default=FPTAS_EPSILON,
+                        help=f"approximation ratio of the fptas method (default: {FPTAS_EPSILON})")
+    args = parser.parse_args(argv)
+
+    solved = solveInstances(iterProblemsFromFile(args.filename), args.method, args.workers, args.time_limit,
+                            args.node_limit, args.epsilon, args.search_workers)
+    solutions = dict()
+    try:
+        for index, instance, solution, stats in solved:
+            if args.format == "jsonl":
+                sys.stdout.write(json.dumps(solutionRecord(index, instance, solution, stats)) + "\n")
+                sys.stdout.flush()
+            elif args.format == "text":
+                sys.stdout.write(f"{instance.name}: {' '.join(solution)}\n")
+                sys.stdout.flush()
+            else:
+                solutions[index] = solution
+        if args.format == "json":
+            json.dump([solutions[index] for index in sorted(solutions)], sys.stdout)
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away, e.g. a pipe into head; point stdout at devnull so that exiting doesn't raise again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
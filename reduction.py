@@ -0,0 +1,129 @@
+import numpy as np
+
+
+class ReductionResult:
+    '''The smaller core problem left by reduceProblem, along with the items it fixed into the knapsack and what it removed.
+
+    removed maps each reduction step to the number of items it took out of the problem.'''
+
+    __slots__ = ("capacity", "items", "fixed_names", "removed")
+
+    def __init__(self, capacity, items, fixed_names, removed):
+        self.capacity = capacity
+        self.items = items
+        self.fixed_names = fixed_names
+        self.removed = removed
+
+    def __repr__(self):
+        removed = ", ".join(f"{count} {step}" for step, count in self.removed.items() if count)
+        return f"ReductionResult({len(self.items)} core items, capacity={self.capacity}; removed: {removed or 'nothing'})"
+
+
+def reduceProblem(capacity, items):
+    '''Shrink a problem instance to a core problem that has an optimal solution in common with it.
+
+    The reduction steps are, in order:
+    - drop items that are heavier than the capacity, or worth nothing;
+    - if all the remaining items fit, take them all;
+    - fix items in or out of the knapsack when the LP-relaxation (Dantzig) bound of every solution that treats
+      them otherwise can't reach the value of the greedy solution;
+    - drop items that are dominated (another item weighs no more and is worth no less) by a set of items that
+      can't all fit in the knapsack together with them. Such an item can always be swapped for one of its dominators,
+      so this is also how duplicated items are merged down to as many copies as could ever be used.
+    Return a ReductionResult; the solution of the original problem is the core solution plus the fixed items.'''
+
+    removed = {"too heavy": 0, "worthless": 0, "fixed in": 0, "fixed out": 0, "dominated": 0}
+    fixed_names = []
+
+    removed["too heavy"] = sum(1 for item in items if item[2] > capacity)
+    removed["worthless"] = sum(1 for item in items if item[1] <= 0 and item[2] <= capacity)
+    items = [item for item in items if item[2] <= capacity and item[1] > 0]
+
+    items, capacity = _takeAllIfTheyFit(items, capacity, fixed_names, removed)
+    if items:
+        items, capacity = _fixByReducedCosts(items, capacity, fixed_names, removed)
+    if items:
+        items = _dropDominated(items, capacity, removed)
+    items, capacity = _takeAllIfTheyFit(items, capacity, fixed_names, removed)
+
+    return ReductionResult(capacity, items, fixed_names, removed)
+
+
+def _takeAllIfTheyFit(items, capacity, fixed_names, removed):
+    if sum(item[2] for item in items) <= capacity:
+        fixed_names.extend(item[0] for item in items)
+        removed["fixed in"] += len(items)
+        return [], capacity - sum(item[2] for item in items)
+    return items, capacity
+
+
+def _dantzigBounds(values, weights, capacities):
+    '''Return the fractional-knapsack bound for each capacity, over items already sorted by decreasing value/weight ratio.'''
+    prefix_values = np.concatenate(([0], np.cumsum(values)))
+    prefix_weights = np.concatenate(([0], np.cumsum(weights)))
+    last_whole = np.searchsorted(prefix_weights, capacities, side='right') - 1
+    bounds = prefix_values[last_whole].astype(np.float64)
+    partial = last_whole < len(values)
+    critical = last_whole[partial]
+    bounds[partial] += (capacities[partial] - prefix_weights[critical]) * values[critical] / weights[critical]
+    return bounds
+
+
+def _fixByReducedCosts(items, capacity, fixed_names, removed):
+    '''Fix the items whose inclusion or exclusion is forced by comparing LP-relaxation bounds against the greedy solution.'''
+
+    values = np.array([item[1] for item in items], dtype=np.int64)
+    weights = np.array([item[2] for item in items], dtype=np.int64)
+
+    # Sort the items by decreasing value/weight ratio; weightless items go first
+    ratios = np.full(len(items), np.inf)
+    weighted = weights > 0
+    ratios[weighted] = values[weighted] / weights[weighted]
+    order = np.argsort(-ratios, kind='stable')
+    values, weights = values[order], weights[order]
+
+    # The greedy solution adds each item, in ratio order, if it still fits
+    greedy_value = 0
+    greedy_weight = 0
+    for value, weight in zip(values.tolist(), weights.tolist()):
+        if greedy_weight + weight <= capacity:
+            greedy_weight += weight
+            greedy_value += value
+
+    # For each item, bound every solution without it, and every solution with it. Any bound below the greedy
+    # value rules out that whole side: the item is then in (or out of) every optimal solution.
+    fix_in = np.zeros(len(items), dtype=bool)
+    fix_out = np.zeros(len(items), dtype=bool)
+    for k in range(len(items)):
+        other_values = np.delete(values, k)
+        other_weights = np.delete(weights, k)
+        bound_without, bound_with = _dantzigBounds(other_values, other_weights,
+                                                   np.array([capacity, capacity - weights[k]]))
+        bound_with += values[k]
+        fix_in[k] = np.floor(bound_without + 1e-9) < greedy_value
+        fix_out[k] = np.floor(bound_with + 1e-9) < greedy_value
+
+    fixed_items = [items[i] for i in order[fix_in]]
+    fixed_names.extend(item[0] for item in fixed_items)
+    removed["fixed in"] += len(fixed_items)
+    removed["fixed out"] += int(np.count_nonzero(fix_out))
+    core = np.sort(order[~fix_in & ~fix_out])
+    return [items[i] for i in core], capacity - sum(item[2] for item in fixed_items)
+
+
+def _dropDominated(items, capacity, removed):
+    '''Drop, one at a time, each item whose remaining dominators can't all fit in the knapsack alongside it.'''
+
+    values = np.array([item[1] for item in items], dtype=np.int64)
+    weights = np.array([item[2] for item in items], dtype=np.int64)
+    alive = np.ones(len(items), dtype=bool)
+
+    # Only the items still in the problem count as dominators, so that no two items can justify dropping each other
+    for j in range(len(items)):
+        dominators = alive & (weights <= weights[j]) & (values >= values[j])
+        dominators[j] = False
+        if weights[dominators].sum() + weights[j] > capacity:
+            alive[j] = False
+
+    removed["dominated"] += len(items) - int(np.count_nonzero(alive))
+    return [item for item, keep in zip(items, alive) if keep]
@@ -0,0 +1,116 @@
+from collections import OrderedDict
+import hashlib
+import json
+import sqlite3
+
+
+def canonicalOrder(items):
+    '''Return the indices of the given (name, value, weight) items, sorted by value and then weight.
+
+    Two instances with the same capacity and the same items in canonical order are the same problem,
+    whatever their item names or order.'''
+    return sorted(range(len(items)), key=lambda i: (items[i][1], items[i][2]))
+
+
+def instanceFingerprint(capacity, items, order=None):
+    '''Return a fingerprint of the given problem instance that ignores item names and order.'''
+    if order is None:
+        order = canonicalOrder(items)
+    canonical = f"{capacity};" + ",".join(f"{items[i][1]}:{items[i][2]}" for i in order)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SolutionCache:
+    '''A cache of problem instance solutions, with an in-memory LRU in front of an optional sqlite file.
+
+    Solutions are stored as positions in the canonical item order, so a cached solution is mapped back onto the
+    item names of whichever equivalent instance it is looked up for. Both levels evict their least recently used
+    solutions once they hold more than their maximum number of entries.'''
+
+    def __init__(self, filename=None, max_entries=1024, max_disk_entries=100000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self.__memory = OrderedDict() # Maps fingerprint to a list of canonical positions, least recently used first
+        self.__clock = 0 # Increases with every disk access, to order disk entries by when they were last used
+
+        self.__connection = None
+        if filename is not None:
+            self.__connection = sqlite3.connect(filename)
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                                      "(fingerprint TEXT PRIMARY KEY, positions TEXT NOT NULL, last_used INTEGER NOT NULL)")
+            self.__clock = self.__connection.execute("SELECT COALESCE(MAX(last_used), 0) FROM solutions").fetchone()[0]
+
+    def __repr__(self):
+        return f"SolutionCache(hits={self.hits}, misses={self.misses}, entries={len(self.__memory)})"
+
+    def lookup(self, capacity, items):
+        '''Return the sorted solution of the given instance if it is cached, or None if it isn't.'''
+
+        order = canonicalOrder(items)
+        fingerprint = instanceFingerprint(capacity, items, order)
+
+        positions = self.__memory.get(fingerprint)
+        if positions is not None:
+            self.__memory.move_to_end(fingerprint)
+        elif self.__connection is not None:
+            row = self.__connection.execute("SELECT positions FROM solutions WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            if row is not None:
+                positions = json.loads(row[0])
+                self.__touchDisk(fingerprint)
+                self.__remember(fingerprint, positions)
+
+        if positions is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return sorted(items[order[k]][0] for k in positions)
+
+    def store(self, capacity, items, solution):
+        '''Add the given solution (a list of item names) of the given instance to the cache.'''
+
+        order = canonicalOrder(items)
+        fingerprint = instanceFingerprint(capacity, items, order)
+
+        # Record which canonical positions hold the chosen items; duplicate names are matched up one at a time
+        remaining = dict()
+        for name in solution:
+            remaining[name] = remaining.get(name, 0) + 1
+        positions = []
+        for k, i in enumerate(order):
+            if remaining.get(items[i][0], 0):
+                remaining[items[i][0]] -= 1
+                positions.append(k)
+
+        self.__remember(fingerprint, positions)
+        if self.__connection is not None:
+            self.__clock += 1
+            self.__connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)",
+                                      (fingerprint, json.dumps(positions), self.__clock))
+            self.__connection.execute("DELETE FROM solutions WHERE fingerprint IN (SELECT fingerprint FROM solutions "
+                                      "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,))
+            self.__connection.commit()
+
+    def stats(self):
+        '''Return a dict of the cache's hit and miss counts and current sizes.'''
+        stats = {"hits": self.hits, "misses": self.misses, "memory_entries": len(self.__memory)}
+        if self.__connection is not None:
+            stats["disk_entries"] = self.__connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        return stats
+
+    def close(self):
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+    def __remember(self, fingerprint, positions):
+        self.__memory[fingerprint] = positions
+        self.__memory.move_to_end(fingerprint)
+        while len(self.__memory) > self.max_entries:
+            self.__memory.popitem(last=False)
+
+    def __touchDisk(self, fingerprint):
+        self.__clock += 1
+        self.__connection.execute("UPDATE solutions SET last_used = ? WHERE fingerprint = ?", (self.__clock, fingerprint))
+        self.__connection.commit()
@@ -0,0 +1,233 @@
+from backpack import Solver, ProblemInstance, FPTAS_EPSILON, _solveProblem
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+
+def _solveBatch(payloads):
+    '''Solve a batch of problem instances in a worker process; return an (ok, solution or error message) pair for each.'''
+    results = []
+    for payload in payloads:
+        try:
+            results.append((True, _solveProblem(*payload)[0]))
+        except Exception as error:
+            results.append((False, repr(error)))
+    return results
+
+
+class SolverService:
+    '''An asyncio front end that solves problem instances in a managed pool of worker processes.
+
+    Requests wait in a bounded queue, so callers of solve are held back once max_queue requests are waiting. Requests
+    for small instances that arrive within batch_window seconds of each other are sent to the pool together, up to
+    batch_size at a time, to cut the per-task dispatch overhead; instances with more than small_items items are always
+    sent on their own. At most max_in_flight batches are handed to the pool at once. A request whose caller is cancelled
+    before its batch starts is dropped, and a batch that hasn't started is cancelled outright if all of its requests are;
+    one that has started still counts towards max_in_flight until it finishes. Each worker splits its bruteForce and
+    meetInMiddle searches across search_workers processes of its own, as in Solver(search_workers).'''
+
+    def __init__(self, workers=None, max_queue=1024, batch_size=32, batch_window=0.002, small_items=64, max_in_flight=None,
+                 search_workers=1):
+        self.workers = workers or os.cpu_count()
+        self.search_workers = search_workers
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.small_items = small_items
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.batches_sent = 0
+        self.__valid_methods = list(Solver().SOLVER_METHODS)
+        self.__queue = None
+        self.__executor = None
+        self.__dispatcher = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        self.__queue = asyncio.Queue(maxsize=self.max_queue)
+        self.__in_flight = asyncio.Semaphore(self.max_in_flight)
+        self.__executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.__dispatcher = asyncio.create_task(self.__dispatch())
+
+    async def close(self):
+        '''Stop taking requests, cancel any whose batch hasn't started, and shut the worker processes down once the running
+        batches have been answered.'''
+        self.__dispatcher.cancel()
+        try:
+            await self.__dispatcher
+        except asyncio.CancelledError:
+            pass
+        while not self.__queue.empty():
+            self.__queue.get_nowait()[1].cancel()
+
+        # Shutting down waits for the running batches, so it happens off the event loop, which still has to deliver their
+        # results; the batches that haven't started are cancelled, along with their requests
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.__executor.shutdown(wait=True, cancel_futures=True))
+
+    async def solve(self, instance, method="auto", time_limit=None, node_limit=None, epsilon=FPTAS_EPSILON):
+        '''Solve a ProblemInstance, or a (capacity, [(name, value, weight), ...]) tuple; return its sorted solution.
+
+        time_limit, node_limit and epsilon are applied to this instance as in Solver.getSolutions.'''
+
+        # Confirm that method argument is valid before queueing anything
+        if method not in self.__valid_methods:
+            raise ValueError(f"Invalid method. Valid method names: {', '.join(self.__valid_methods)}")
+
+        if isinstance(instance, ProblemInstance):
+            payload = (method, instance.capacity, list(instance.names), array('q', instance.values),
+                       array('q', instance.weights), time_limit, node_limit, epsilon, self.search_workers)
+        else:
+            capacity, items = instance
+            payload = (method, capacity, [item[0] for item in items], array('q', [item[1] for item in items]),
+                       array('q', [item[2] for item in items]), time_limit, node_limit, epsilon, self.search_workers)
+
+        # Waiting here, for room in the queue, is the backpressure on callers
+        future = asyncio.get_running_loop().create_future()
+        await self.__queue.put((payload, future))
+        ok, result = await future
+        if not ok:
+            raise ValueError(result)
+        return result
+
+    async def __dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.__queue.get()]
+            large_request = None
+            try:
+                # Gather more small requests until the batch is full or the batch window has passed
+                if len(batch[0][0][2]) <= self.small_items:
+                    deadline = loop.time() + self.batch_window
+                    while len(batch) < self.batch_size:
+                        if self.__queue.empty():
+                            remaining = deadline - loop.time()
+                            if remaining <= 0:
+                                break
+                            try:
+                                request = await asyncio.wait_for(self.__queue.get(), remaining)
+                            except asyncio.TimeoutError:
+                                break
+                        else:
+                            request = self.__queue.get_nowait()
+
+                        # Large requests don't wait for a batch to fill up
+                        if len(request[0][2]) > self.small_items:
+                            large_request = request
+                            await self.__in_flight.acquire()
+                            self.__send([large_request], loop)
+                            large_request = None
+                        else:
+                            batch.append(request)
+
+                await self.__in_flight.acquire()
+            except asyncio.CancelledError:
+                # The service is closing, so the requests already taken off the queue will never be sent
+                for payload, future in batch + ([large_request] if large_request is not None else []):
+                    future.cancel()
+                raise
+            self.__send(batch, loop)
+
+    def __send(self, batch, loop):
+        '''Hand a batch to the pool, unless all of its callers have already gone away.'''
+
+        # Drop the requests whose callers were cancelled while they waited
+        batch = [(payload, future) for payload, future in batch if not future.cancelled()]
+        if not batch:
+            self.__in_flight.release()
+            return
+
+        # The pool's own future is kept, since cancelling it only takes back a batch that hasn't started; a running batch
+        # holds on to its place in flight until it's done
+        pool_future = self.__executor.submit(_solveBatch, [payload for payload, future in batch])
+        batch_future = asyncio.wrap_future(pool_future, loop=loop)
+        self.batches_sent += 1
+
+        def cancelBatchIfAbandoned(future):
+            if all(request_future.cancelled() for payload, request_future in batch):
+                pool_future.cancel()
+
+        def deliverResults(batch_future):
+            self.__in_flight.release()
+            if batch_future.cancelled():
+                for payload, future in batch:
+                    future.cancel()
+                return
+            if batch_future.exception() is not None:
+                results = [(False, repr(batch_future.exception()))] * len(batch)
+            else:
+                results = batch_future.result()
+            for (payload, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+        for payload, future in batch:
+            future.add_done_callback(cancelBatchIfAbandoned)
+        batch_future.add_done_callback(deliverResults)
+
+
+async def serveLines(service, reader, write):
+    '''Solve each JSON request line from reader, writing a JSON response line as each one finishes.
+
+    A request looks like {"id": 1, "capacity": 50, "items": [["Hat", 7, 5], ...], "method": "auto"}, optionally with
+    "time_limit" and "node_limit" budgets, or an "epsilon" for the fptas method; its response is
+    {"id": 1, "solution": [...]}, or {"id": 1, "error": "..."} if it couldn't be read or solved. A line that isn't a
+    JSON object gets an error response with a null id.'''
+
+    async def handle(line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+            request_id = request.get("id")
+            solution = await service.solve((request["capacity"], request["items"]), request.get("method", "auto"),
+                                           request.get("time_limit"), request.get("node_limit"),
+                                           request.get("epsilon", FPTAS_EPSILON))
+            response = {"id": request_id, "solution": solution}
+        except Exception as error:
+            response = {"id": request_id, "error": str(error)}
+        write(json.dumps(response) + "\n")
+
+    tasks = set()
+    while True:
+        line = await reader()
+        if not line:
+            break
+        if line.strip():
+            task = asyncio.create_task(handle(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve JSON-lines Knapsack requests from stdin, writing JSON-lines solutions to stdout.")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=32, help="most requests sent to a worker at once (default: 32)")
+    parser.add_argument("--batch-window", type=float, default=0.002,
+                        help="seconds to wait for more small requests to batch together (default: 0.002)")
+    parser.add_argument("--max-queue", type=int, default=1024, help="most requests waiting at once (default: 1024)")
+    args = parser.parse_args(argv)
+
+    loop = asyncio.get_running_loop()
+
+    def write(text):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    async with SolverService(args.workers, args.max_queue, args.batch_size, args.batch_window) as service:
+        await serveLines(service, lambda: loop.run_in_executor(None, sys.stdin.readline), write)
+        print(f"Sent {service.batches_sent} batches", file=sys.stderr)
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,7 +1,23 @@
-from backpack import solveKnapsackFile, Solver
+from backpack import (solveKnapsackFile, solveCapacities, Solver, iterProblemsFromFile, solve_stream, selectMethod, selectSweepMethod,
+                      APPROXIMATE_METHODS)
+from Stack import Stack
+from binary_problems import convertTextToBinary, BinaryProblemFile
+from solution_cache import SolutionCache
+from reduction import reduceProblem
+from benchmark import compareToBaseline
+from solver_service import SolverService, serveLines
+import knapsack_cli
 import unittest
+import asyncio
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import os
 import time
-import matplotlib.pyplot as plt
+import warnings
 
 class BackpackTest(unittest.TestCase):
 
@@ -18,17 +34,422 @@ class BackpackTest(unittest.TestCase):
         expected_solution = eval(expected_solution_string)
         f.close()
 
-        # Test each algorithm that the solver currently supports
+        # Test each exact algorithm that the solver currently supports
         solver = Solver()
         solver.loadProblemFromFile(problems_filename)
         for method in solver.SOLVER_METHODS:
+            if method in APPROXIMATE_METHODS:
+                continue
             print(f"Testing {method}...")
             self.assertEqual(solver.getSolutions(method), expected_solution, f"\n\n\n\nThis failure occurred when testing {method}.")
             print(f"{method} test was successful.")
 
+    def testDynamicProgrammingOnLargerFile(self):
+
+        # The exhaustive methods are too slow for problems_size20.txt, but the dynamic programming method is not
+        f = open('problems/problems_size20_solutions.txt')
+        expected_solution = eval(next(f))
+        f.close()
+
+        self.assertEqual(solveKnapsackFile("problems_size20.txt", method="dynamicProgramming"), expected_solution)
+
+    def testSchroeppelShamirOnLargerFile(self):
+
+        # Too many items for meetInMiddle's memory, but not for the four-list variant
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size40.txt")
+        solutions, stats = solver.getSolutions("schroeppelShamir", return_stats=True)
+        optimal_solutions, optimal_stats = solver.getSolutions("branchAndBound", return_stats=True)
+        self.assertEqual([instance_stats.best_value for instance_stats in stats],
+                         [instance_stats.best_value for instance_stats in optimal_stats])
+        self.assertTrue(all(instance_stats.optimal for instance_stats in stats))
+
+    def testValueIndexedMethodsOnHugeCapacities(self):
+
+        # Scaling every weight and the capacity up by a million leaves the value-indexed table the same size
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size20.txt")
+        expected_solutions, expected_stats = solver.getSolutions("branchAndBound", return_stats=True)
+        solver.problems = [(capacity * 10**6, [(name, value, weight * 10**6) for name, value, weight in items])
+                           for capacity, items in solver.problems]
+        self.assertEqual(selectMethod(*solver.problems[0]), "minWeightDynamicProgramming")
+        solutions, stats = solver.getSolutions("minWeightDynamicProgramming", return_stats=True)
+        self.assertEqual([instance_stats.best_value for instance_stats in stats],
+                         [instance_stats.best_value for instance_stats in expected_stats])
+
+        # Approximate solutions are within their ratio of the optimal value, and below their certified bound;
+        # with values of at most 100, an epsilon of 0.1 needs no scaling, so it gives optimal solutions
+        for epsilon in (0.5, 0.1):
+            solutions, stats = solver.getSolutions("fptas", return_stats=True, epsilon=epsilon)
+            for instance_stats, optimal_stats in zip(stats, expected_stats):
+                self.assertGreaterEqual(instance_stats.best_value, (1 - epsilon) * optimal_stats.best_value)
+                self.assertGreaterEqual(instance_stats.upper_bound, optimal_stats.best_value)
+            self.assertEqual(all(instance_stats.optimal for instance_stats in stats), epsilon == 0.1)
+
+    def testIncrementalEditsMatchColdSolves(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size10.txt")
+        for method in ("dynamicProgramming", "meetInMiddle", "branchAndBound"):
+            problem = solver.incrementalProblem(0)
+            problem.solve(method)
+            edits = [lambda: problem.add_item("gem", 60, 1), lambda: problem.set_capacity(problem.capacity - 5),
+                     lambda: problem.updateItem("gem", 5, 9), lambda: problem.set_capacity(problem.capacity + 20),
+                     lambda: problem.remove_item(problem.solution[0]), lambda: problem.add_item("rock", 1, problem.capacity + 1)]
+            for edit in edits:
+                edit()
+                problem.solve(method)
+                cold_solver = Solver()
+                cold_solver.problems = [(problem.capacity, problem.itemList())]
+                cold_stats = cold_solver.getSolutions("dynamicProgramming", return_stats=True)[1][0]
+                self.assertEqual(problem.stats.best_value, cold_stats.best_value, method)
+
+                # Solving from scratch through a reduction ignores the warm start of items that the reduction took out
+                if method == "branchAndBound":
+                    self.assertEqual(problem.solve(method, reduce=True), problem.solution)
+
+            # An item too heavy for the knapsack can't change the optimum, so the kept solution is returned without solving
+            self.assertTrue(problem.stats.cached)
+            self.assertRaises(ValueError, problem.add_item, "rock", 1, 1)
+
+    def testInfeasibleOrStaleWarmStartsAreIgnored(self):
+        solver = Solver()
+        solver.problems = [(10, [("a", 20, 20), ("b", 20, 20), ("c", 20, 20), ("d", 1, 5)])]
+        for warm_start in (["a", "b", "c"], ["d", "d"], ["gone"]):
+            self.assertEqual(solver.getSolutions("branchAndBound", warm_starts={0: warm_start}), [["d"]])
+            self.assertEqual(solver.getSolutions("branchAndBound", workers=2, warm_starts={0: warm_start}), [["d"]])
+
+        # Warm starts don't carry over to the next call, or to newly loaded problems
+        self.assertEqual(solver.getSolutions("branchAndBound"), [["d"]])
+        self.assertEqual(solver.warm_starts, dict())
+        solver.getSolutions("branchAndBound", warm_starts={0: ["d"]})
+        solver.loadProblemFromFile("problems_size10.txt")
+        self.assertEqual(solver.warm_starts, dict())
+
+    def testCapacitySweepMatchesSeparateSolves(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size10.txt")
+        capacity, items = solver.problems[0]
+        capacities = [capacity, 0, capacity // 2, capacity * 3, capacity // 2]
+        solver.problems = [(swept_capacity, items) for swept_capacity in capacities]
+        expected_values = [instance_stats.best_value for instance_stats in solver.getSolutions("backtrack", return_stats=True)[1]]
+        for method in ("dynamicProgramming", "minWeightDynamicProgramming", "meetInMiddle", "branchAndBound", "auto"):
+            solutions, values = solveCapacities(items, capacities, method, return_values=True)
+            self.assertEqual(values, expected_values, method)
+            self.assertEqual(solutions[2], solutions[4])
+
+        # auto sweeps with whichever method that shares its work between the capacities has the least to do, unless none
+        # of them fits in memory
+        many_items = [(str(i), i % 7 + 1, i % 5 + 1) for i in range(50)]
+        self.assertEqual(selectSweepMethod(100, many_items), "dynamicProgramming")
+        self.assertEqual(selectSweepMethod(10**9, many_items), "minWeightDynamicProgramming")
+        self.assertEqual(selectSweepMethod(max(capacities), items), "meetInMiddle")
+        self.assertEqual(selectSweepMethod(max(capacities), items, memory_budget=2**6), "auto")
+        self.assertEqual(solveCapacities(items, capacities, return_values=True, memory_budget=2**6)[1], expected_values)
+
+    def testParallelSolutionsKeepOrder(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size20.txt")
+        self.assertEqual(solver.getSolutions("branchAndBound", workers=2), solver.getSolutions("branchAndBound"))
+
+    def testSearchWorkersMatchSingleProcess(self):
+        solver = Solver(search_workers=2)
+        solver.loadProblemFromFile("problems_size20.txt")
+        solver.problems = [problem for problem in solver.problems if len(problem[1]) <= 20]
+        single_process_solver = Solver()
+        single_process_solver.problems = solver.problems
+        for method in ("bruteForce", "meetInMiddle"):
+            self.assertEqual(solver.getSolutions(method), single_process_solver.getSolutions(method))
+
+        # Instance workers keep the search workers setting
+        solver.problems = solver.problems[:2]
+        solutions, stats = solver.getSolutions("meetInMiddle", workers=2, return_stats=True)
+        self.assertEqual(solutions, single_process_solver.getSolutions("meetInMiddle")[:2])
+
+    def testStreamingMatchesLoadedFile(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size10.txt")
+        self.assertEqual(list(solve_stream("problems_size10.txt", "backtrack")), solver.getSolutions("backtrack"))
+
+    def testStreamingParserToleratesSpacesAndBlankLines(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("1\n\nCamping Trip\n10\nBig Hat  7  5\n\nTent 13 16\nBook 2 4\n")
+        try:
+            instances = list(iterProblemsFromFile(f.name))
+        finally:
+            os.remove(f.name)
+        self.assertEqual(len(instances), 1)
+        self.assertEqual(instances[0].name, "Camping Trip")
+        self.assertEqual(instances[0].capacity, 10)
+        self.assertEqual(instances[0].items(), [("Big Hat", 7, 5), ("Tent", 13, 16), ("Book", 2, 4)])
+
+    def testBinaryFormatRoundTrip(self):
+        text_solver = Solver()
+        text_solver.loadProblemFromFile("problems/toy_problems.txt")
+        with tempfile.TemporaryDirectory() as directory:
+            binary_filename = os.path.join(directory, "toy_problems.bin")
+            convertTextToBinary("problems/toy_problems.txt", binary_filename)
+            problem_file = BinaryProblemFile(binary_filename)
+            self.assertEqual(len(problem_file), 2)
+            self.assertEqual(problem_file[-1].name, "Problem1")
+            binary_solver = Solver()
+            binary_solver.loadProblemInstances(problem_file)
+            del problem_file
+        self.assertEqual(binary_solver.problems, text_solver.problems)
+
+    def testReducedProblemsKeepTheirSolutions(self):
+        f = open('problems/problems_size20_solutions.txt')
+        expected_solution = eval(next(f))
+        f.close()
+
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size20.txt")
+        for method in ("backtrack", "branchAndBound", "dynamicProgramming"):
+            self.assertEqual(solver.getSolutions(method, reduce=True), expected_solution)
+
+    def testReductionMergesDuplicatesAndTakesWhatFits(self):
+        reduced = reduceProblem(10, [("a", 5, 5), ("b", 5, 5), ("c", 5, 5), ("anvil", 9, 11), ("pebble", 0, 1)])
+        self.assertEqual(reduced.items, [])
+        self.assertEqual(reduced.fixed_names, ["b", "c"])
+        self.assertEqual(reduced.removed, {"too heavy": 1, "worthless": 1, "fixed in": 2, "fixed out": 0, "dominated": 1})
+
+    def testReductionSortsWeightlessItemsWithoutWarnings(self):
+        solver = Solver()
+        solver.problems = [(10, [("feather", 5, 0), ("b", 6, 4), ("c", 7, 5), ("d", 3, 3), ("e", 4, 6)])]
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertEqual(solver.getSolutions("branchAndBound", reduce=True), [["b", "c", "feather"]])
+
+    def testAutoSelection(self):
+
+        # Tiny instances go to branch and bound; small tables to dynamic programming; big uncorrelated instances to branch and bound
+        self.assertEqual(selectMethod(100, [(str(i), i % 7 + 1, i % 5 + 1) for i in range(10)]), "branchAndBound")
+        self.assertEqual(selectMethod(100, [(str(i), i % 7 + 1, i % 5 + 1) for i in range(20)]), "dynamicProgramming")
+        uncorrelated = [(str(i), (37 * i) % 101 + 1, (53 * i) % 97 + 1) for i in range(1000)]
+        self.assertEqual(selectMethod(20000, uncorrelated), "branchAndBound")
+
+        # Strongly correlated instances avoid branch and bound, as far as the memory budget allows, and take whichever
+        # of dynamic programming and meet in the middle has less work to do
+        correlated = [(str(i), 10**6 + 1000 * i + 10, 10**6 + 1000 * i) for i in range(20)]
+        self.assertEqual(selectMethod(10**7, correlated), "meetInMiddle")
+        self.assertEqual(selectMethod(10**5, correlated * 3), "dynamicProgramming")
+        self.assertEqual(selectMethod(10**7, correlated * 3, memory_budget=2**20), "branchAndBound")
+        self.assertEqual(selectMethod(10**7, correlated * 3, memory_budget=2**20), "branchAndBound")
+        self.assertEqual(selectMethod(10**7, correlated * 3, memory_budget=2**24), "schroeppelShamir")
+
+        # A single outlying item doesn't hide that the rest of the values track the weights
+        subset_sum = [(str(i), 10**5 + 25000 * i, 10**5 + 25000 * i) for i in range(36)] + [("outlier", 10**8, 1)]
+        self.assertEqual(selectMethod(sum(item[2] for item in subset_sum) // 2, subset_sum), "meetInMiddle")
+
+    def testStatsAreReportedForEveryInstance(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size10.txt")
+        reported = []
+        solver.addStatsHook(lambda problem_index, stats: reported.append(problem_index))
+
+        solutions, stats = solver.getSolutions("backtrack", return_stats=True)
+        self.assertEqual(sorted(reported), list(range(10)))
+        self.assertTrue(all(instance_stats.nodes_expanded > 0 for instance_stats in stats))
+        self.assertTrue(all(0 < instance_stats.max_stack_depth <= 16 for instance_stats in stats))
+
+        solutions, stats = solver.getSolutions("meetInMiddle", return_stats=True)
+        self.assertEqual(set(stats[0].phase_times), {"enumeration", "frontier", "matching"})
+        self.assertEqual(stats[0].subset_counts["half_a"], 2**6)
+
+    def testStatsHooksFireAsEachInstanceIsSolved(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size10.txt")
+        reported = []
+        solver.addStatsHook(lambda problem_index, stats: reported.append(
+            (problem_index, stats.best_value, [instance_stats.nodes_expanded for instance_stats in solver.stats])))
+
+        # Each hook call comes before the next instance is searched, with the instance's value already filled in
+        solutions, stats = solver.getSolutions("backtrack", return_stats=True, reduce=True)
+        self.assertEqual([problem_index for problem_index, best_value, nodes_expanded in reported], list(range(10)))
+        for problem_index, best_value, nodes_expanded in reported:
+            self.assertEqual(best_value, stats[problem_index].best_value)
+            self.assertEqual(nodes_expanded[problem_index + 1:], [0] * (9 - problem_index))
+
+        reported.clear()
+        solutions, stats = solver.getSolutions("backtrack", workers=2, return_stats=True)
+        self.assertEqual(sorted(problem_index for problem_index, best_value, nodes_expanded in reported), list(range(10)))
+        self.assertTrue(all(best_value == stats[problem_index].best_value for problem_index, best_value, nodes_expanded in reported))
+
+    def testBudgetsReturnBoundedIncumbents(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size20.txt")
+        optimal_solutions, optimal_stats = solver.getSolutions("dynamicProgramming", return_stats=True)
+        for method in ("bruteForce", "backtrack", "branchAndBound"):
+            solutions, stats = solver.getSolutions(method, return_stats=True, node_limit=10)
+            for instance_stats, instance_optimal_stats in zip(stats, optimal_stats):
+                self.assertLessEqual(instance_stats.best_value, instance_optimal_stats.best_value)
+                self.assertGreaterEqual(instance_stats.upper_bound, instance_optimal_stats.best_value)
+                self.assertGreater(instance_stats.best_value, 0)
+            self.assertFalse(all(instance_stats.optimal for instance_stats in stats), method)
+
+
+class SolutionCacheTest(unittest.TestCase):
+
+    def testRenamedAndReorderedInstancesHitTheCache(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size10.txt")
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SolutionCache(os.path.join(directory, "cache.sqlite"))
+            expected_solution = solver.getSolutions("backtrack", cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (0, 10))
+
+            # Rename and reverse every instance's items; each cached solution should come back under the new names
+            solver.problems = [(capacity, [("x" + name, value, weight) for name, value, weight in reversed(items)])
+                               for capacity, items in solver.problems]
+            renamed_solution = [sorted("x" + name for name in solution) for solution in expected_solution]
+            self.assertEqual(solver.getSolutions("dynamicProgramming", cache=cache), renamed_solution)
+            self.assertEqual((cache.hits, cache.misses), (10, 10))
+            cache.close()
+
+            # A fresh cache with a tiny memory LRU still finds every solution on disk
+            cache = SolutionCache(os.path.join(directory, "cache.sqlite"), max_entries=2)
+            self.assertEqual(solver.getSolutions("bruteForce", cache=cache), renamed_solution)
+            self.assertEqual(cache.stats(), {"hits": 10, "misses": 0, "memory_entries": 2, "disk_entries": 10})
+            cache.close()
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def testRegressionsAgainstBaseline(self):
+        baseline = [{"method": "backtrack", "file": "a.txt", "status": "ok", "wall_median": 1.0},
+                    {"method": "backtrack", "file": "b.txt", "status": "ok", "wall_median": 1.0},
+                    {"method": "backtrack", "file": "c.txt", "status": "ok", "wall_median": 0.001},
+                    {"method": "backtrack", "file": "d.txt", "status": "timeout", "wall_median": None}]
+        records = [{"method": "backtrack", "file": "a.txt", "status": "ok", "wall_median": 1.2},
+                   {"method": "backtrack", "file": "b.txt", "status": "timeout", "wall_median": None},
+                   {"method": "backtrack", "file": "c.txt", "status": "ok", "wall_median": 0.005},
+                   {"method": "backtrack", "file": "d.txt", "status": "timeout", "wall_median": None}]
+        self.assertEqual(len(compareToBaseline(records, baseline)), 1)
+        self.assertEqual(len(compareToBaseline(records, baseline, tolerance=0.1)), 2)
+
+
+class SolverServiceTest(unittest.TestCase):
+
+    def testBatchedSolutionsAndCancellation(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size10.txt")
+        expected_solution = solver.getSolutions("branchAndBound")
+
+        async def solveAll():
+            async with SolverService(workers=1, max_queue=4) as service:
+                solutions = await asyncio.gather(*[service.solve(problem, "branchAndBound") for problem in solver.problems])
+
+                # Small requests that arrive together share batches
+                self.assertLess(service.batches_sent, len(solver.problems))
+
+                # A cancelled request is dropped, and doesn't get in the way of the next one
+                request = asyncio.create_task(service.solve(solver.problems[0]))
+                await asyncio.sleep(0)
+                request.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await request
+                self.assertEqual(await service.solve(solver.problems[0], "dynamicProgramming"), expected_solution[0])
+
+                with self.assertRaises(ValueError):
+                    await service.solve(solver.problems[0], "guess")
+                return solutions
+
+        self.assertEqual(asyncio.run(solveAll()), expected_solution)
+
+    def testClosingWithBatchesInFlight(self):
+        solver = Solver()
+        solver.loadProblemFromFile("problems_size20.txt")
+
+        async def closeEarly():
+            service = SolverService(workers=1, batch_size=1, max_in_flight=2)
+            await service.start()
+
+            # A cancelled request whose batch is already running keeps its place in flight until the batch is done
+            running = asyncio.create_task(service.solve(solver.problems[0], "backtrack", time_limit=0.5))
+            await asyncio.sleep(0.1)
+            running.cancel()
+            requests = [asyncio.create_task(service.solve(problem, "backtrack", time_limit=0.5)) for problem in solver.problems]
+            await asyncio.sleep(0.1)
+            self.assertEqual(service.batches_sent, 2)
+
+            # Closing the service answers or cancels every request, rather than leaving any of them waiting forever
+            await service.close()
+            done, pending = await asyncio.wait(requests, timeout=5)
+            self.assertEqual(pending, set())
+            self.assertTrue(any(request.cancelled() for request in requests))
+            self.assertTrue(any(not request.cancelled() for request in requests))
+
+        asyncio.run(closeEarly())
+
+    def testBadRequestLinesGetErrorResponses(self):
+        lines = ['{"id": 1, "capacity": 10, "items": [["a", 5, 4], ["b", 6, 7], ["c", 3, 3]], "node_limit": 100}\n',
+                 'not json\n', '{"id": 2, "capacity": 10}\n', '']
+        responses = []
+
+        async def reader():
+            return lines.pop(0)
+
+        async def serve():
+            async with SolverService(workers=1) as service:
+                await serveLines(service, reader, lambda text: responses.append(json.loads(text)))
+
+        asyncio.run(serve())
+        self.assertEqual(sorted(responses, key=lambda response: str(response["id"])),
+                         [{"id": 1, "solution": ["b", "c"]}, {"id": 2, "error": "'items'"},
+                          {"id": None, "error": "Expecting value: line 1 column 1 (char 0)"}])
+
+
+class CommandLineTest(unittest.TestCase):
+
+    def testOutputFormats(self):
+        expected_solution = Solver()
+        expected_solution.loadProblemFromFile("problems_size10.txt")
+        expected_solution = expected_solution.getSolutions("branchAndBound")
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            knapsack_cli.main(["problems_size10.txt", "--method", "branchAndBound", "--format", "json"])
+        self.assertEqual(json.loads(output.getvalue()), expected_solution)
+
+        # Parallel JSON lines come out in the order they finish, each with its index in the file
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            knapsack_cli.main(["problems_size10.txt", "--method", "branchAndBound", "--workers", "2"])
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([record["solution"] for record in sorted(records, key=lambda record: record["index"])],
+                         expected_solution)
+        self.assertTrue(all(record["optimal"] for record in records))
+
+    def testDefaultCommandLineSolveDoesNotImportNumPy(self):
+
+        # auto picks branch and bound for these instances, so solving them shouldn't pay for importing NumPy, whether
+        # from the command line or as an IncrementalProblem
+        check = ("import knapsack_cli, backpack, sys; knapsack_cli.main(['problems_size10.txt', '--format', 'text']); "
+                 "problem = backpack.IncrementalProblem(10, [('a', 5, 4), ('b', 6, 7)]); problem.add_item('c', 3, 3); "
+                 "problem.updateItem('a', 6, 4); problem.solve(); print('numpy' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.splitlines()[-1], "False")
+        self.assertEqual(len(result.stdout.splitlines()), 11)
+
+
+class StackTest(unittest.TestCase):
+
+    def testPushPopOrder(self):
+        stack = Stack()
+        for i in range(5):
+            stack.push(i)
+        self.assertEqual(stack.peek(), 4)
+        self.assertEqual([stack.pop() for i in range(5)], [4, 3, 2, 1, 0])
+        self.assertTrue(stack.is_empty())
+        self.assertRaises(Stack.TopElementError, stack.pop)
+        self.assertRaises(Stack.TopElementError, stack.peek)
+
 
 def produce_plots():
-    
+
+    # Only the plots need matplotlib, which is slow to import
+    import matplotlib.pyplot as plt
+
     SIZES = [10, 15, 20]
     timings = dict() # maps file's approximate problem size to time to solve entire file
 